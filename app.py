@@ -1,21 +1,39 @@
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
 import numpy as np
 import pandas as pd
-import json
 import os
+import tempfile
 from pathlib import Path
 
-# Load model
-model = YOLO("best.pt")
-class_names = model.names
+from detection import boxes_to_detections, predict_in_batches
+from detection_cache import DetectionCache, weights_sha256
+from detection_io import append_detection_batch, export_json, save_detections
+from model_provider import get_provider
+from video_ingest import VideoDetectionPipeline
+
+MODEL_PATH = "best.pt"
+CONF_THRESHOLD = 0.5
+DETECTION_CACHE_DIR = ".detection_cache"
+
+# Model is shared by every session and only loaded when an image misses the cache
+provider = get_provider(MODEL_PATH)
+
+
+@st.cache_resource
+def get_detection_cache(persist):
+    """Detection cache shared by every rerun and session of this server"""
+    return DetectionCache(max_bytes=512 << 20, cache_dir=DETECTION_CACHE_DIR if persist else None,
+                          max_disk_bytes=2 << 30)
 
 st.set_page_config(page_title="Vehicle Detection - 4 Lane System", layout="wide")
 st.title("Vehicle Detection - 4 Lane Upload System")
 
-# Output file for simulation
-DETECTION_FILE = "detected_vehicles.json"
+# Output files for simulation (binary is what simulation.py reads first; JSON is an export)
+DETECTION_FILE = "detected_vehicles.npz"
+DETECTION_JSON_FILE = "detected_vehicles.json"
+# Append-only batch stream picked up by a running `simulation.py --follow`
+DETECTION_STREAM_FILE = "detected_vehicles.stream"
 
 # Initialize session state
 if "all_detections" not in st.session_state:
@@ -26,6 +44,13 @@ if "all_detections" not in st.session_state:
         'up': []
     }
 
+# Where each lane's detections came from, as (source key, number of boxes) in all_detections order,
+# and the sources already appended to the stream, so Save & Send only sends new boxes
+if "detection_sources" not in st.session_state:
+    st.session_state.detection_sources = {'right': [], 'down': [], 'left': [], 'up': []}
+if "streamed_sources" not in st.session_state:
+    st.session_state.streamed_sources = {'right': set(), 'down': set(), 'left': set(), 'up': set()}
+
 if "uploader_keys" not in st.session_state:
     st.session_state.uploader_keys = {
         'right': str(np.random.randint(0, 1000000)),
@@ -42,8 +67,43 @@ directions = {
     'up': {'color': '🟡', 'emoji': '↑'}
 }
 
+
+def unsent_detections():
+    """Boxes from sources not streamed to the simulation yet, per lane; marks those sources as streamed"""
+    batch = {}
+    for direction, detections in st.session_state.all_detections.items():
+        streamed = st.session_state.streamed_sources[direction]
+        batch[direction] = []
+        start = 0
+        for key, count in st.session_state.detection_sources[direction]:
+            if key not in streamed:
+                batch[direction].extend(detections[start:start + count])
+                streamed.add(key)
+            start += count
+    return batch
+
+
+def remove_video_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Already gone, or still held open by a sampler that has not stopped yet (Windows)
+
+
+def stop_video_pipeline():
+    """Stop the video pipeline, if any, and delete the temp files of uploaded videos"""
+    pipeline = st.session_state.get("video_pipeline")
+    if pipeline is not None:
+        pipeline.stop()
+        # Give the samplers a moment to release their files
+        for sampler in pipeline.samplers.values():
+            sampler.finished.wait(1.0)
+    for _, path in st.session_state.pop("video_files", {}).values():
+        remove_video_file(path)
+
+
 # Clear all button
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("Clear All Detections", width='stretch'):
         # Reset detections
@@ -53,6 +113,8 @@ with col1:
             'left': [],
             'up': []
         }
+        st.session_state.detection_sources = {direction: [] for direction in directions}
+        st.session_state.streamed_sources = {direction: set() for direction in directions}
         # Reset uploader keys (clears uploaded files)
         st.session_state.uploader_keys = {
             'right': str(np.random.randint(0, 1000000)),
@@ -60,77 +122,216 @@ with col1:
             'left': str(np.random.randint(0, 1000000)),
             'up': str(np.random.randint(0, 1000000))
         }
-        # Remove JSON file
-        if os.path.exists(DETECTION_FILE):
-            os.remove(DETECTION_FILE)
+        # Stop any running video pipeline and drop uploaded videos
+        stop_video_pipeline()
+        st.session_state.video_pipeline = None
+        # Remove detection files
+        for path in (DETECTION_FILE, DETECTION_JSON_FILE, DETECTION_STREAM_FILE):
+            if os.path.exists(path):
+                os.remove(path)
         st.rerun()
 
 with col2:
     if st.button("Save & Send to Simulation", width='stretch'):
-        # Save detections to JSON file
-        with open(DETECTION_FILE, 'w') as f:
-            json.dump(st.session_state.all_detections, f, indent=2)
+        # Save detections in the columnar binary format
+        save_detections(DETECTION_FILE, st.session_state.all_detections)
+        # Also hand boxes not sent before to any running simulation as a new batch of arriving traffic
+        batch = unsent_detections()
+        if any(batch.values()):
+            append_detection_batch(DETECTION_STREAM_FILE, batch)
         st.success(f"✅ Detections saved! Run simulation.py to start traffic simulation")
 
+with col3:
+    if st.button("Export JSON", width='stretch'):
+        export_json(DETECTION_JSON_FILE, st.session_state.all_detections)
+        st.success(f"✅ Detections exported to {DETECTION_JSON_FILE}")
+
 st.divider()
 
+# Inference settings
+batch_size = st.sidebar.number_input("Inference batch size", min_value=1, max_value=64, value=8,
+                                     help="Images from all lanes are sent to the model this many at a time")
+persist_cache = st.sidebar.checkbox("Keep detection cache on disk", value=True,
+                                    help=f"Store results in {DETECTION_CACHE_DIR}/ so unchanged images are never re-inferred")
+detection_cache = get_detection_cache(persist_cache)
+
+input_mode = st.sidebar.radio("Input", ["Images", "Video"], horizontal=True)
+if input_mode == "Video":
+    sample_fps = st.sidebar.slider("Frames sampled per second", min_value=0.2, max_value=10.0, value=1.0, step=0.2)
+
+
+def save_uploaded_video(direction, uploaded_file):
+    """
+    Write a lane's uploaded video to a temp file once (OpenCV needs a path)
+    and return the path. The file of a replaced or removed upload is deleted.
+    """
+    saved = st.session_state.setdefault("video_files", {})
+    key = None if uploaded_file is None else (uploaded_file.name, uploaded_file.size)
+    previous = saved.get(direction)
+    if previous is not None and previous[0] != key:
+        remove_video_file(previous[1])
+        del saved[direction]
+    if uploaded_file is None:
+        return None
+    if direction not in saved:
+        suffix = Path(uploaded_file.name).suffix
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
+            f.write(uploaded_file.getvalue())
+        saved[direction] = (key, f.name)
+    return saved[direction][1]
+
+
 # Create 4 columns for 4 lanes
 cols = st.columns(4)
 
+uploads = {}
+video_sources = {}
 for idx, (direction, info) in enumerate(directions.items()):
     with cols[idx]:
         st.subheader(f"{info['emoji']} {direction.upper()}")
         
-        # ✅ Allow multiple file uploads
-        uploaded_files = st.file_uploader(
-            f"Upload images for {direction} lane",
-            type=["jpg", "jpeg", "png"],
-            accept_multiple_files=True,
-            key=f"{direction}_{st.session_state.uploader_keys[direction]}"
-        )
-        
-        if uploaded_files:
-            detection_data = []
-            for uploaded_file in uploaded_files:
-                image = Image.open(uploaded_file).convert("RGB")
-                img_np = np.array(image)
+        if input_mode == "Images":
+            # ✅ Allow multiple file uploads
+            uploads[direction] = st.file_uploader(
+                f"Upload images for {direction} lane",
+                type=["jpg", "jpeg", "png"],
+                accept_multiple_files=True,
+                key=f"{direction}_{st.session_state.uploader_keys[direction]}"
+            )
+        else:
+            uploads[direction] = []
+            video_file = st.file_uploader(
+                f"Upload video for {direction} lane",
+                type=["mp4", "avi", "mov", "mkv"],
+                key=f"{direction}_video_{st.session_state.uploader_keys[direction]}"
+            )
+            stream_url = st.text_input(f"...or stream URL for {direction} lane", placeholder="rtsp://camera/stream",
+                                       key=f"{direction}_url_{st.session_state.uploader_keys[direction]}")
+            source = stream_url.strip() or save_uploaded_video(direction, video_file)
+            if source:
+                video_sources[direction] = source
 
-                # Run prediction
-                results = model.predict(img_np, conf=0.5, verbose=False)
-                annotated_img = results[0].plot()
+# Look every uploaded image up in the detection cache, then run the misses
+# from all lanes through the model in batches
+if not os.path.exists(MODEL_PATH):
+    st.warning(f"Model file '{MODEL_PATH}' not found - detection is disabled.")
+    uploads = {direction: [] for direction in directions}
+    weights_hash = None
+else:
+    weights_hash = weights_sha256(MODEL_PATH)
+lane_results = {direction: [] for direction in directions}
+misses = []
+for direction, uploaded_files in uploads.items():
+    for uploaded_file in uploaded_files or []:
+        image_bytes = uploaded_file.getvalue()
+        cache_key = DetectionCache.make_key(image_bytes, weights_hash, CONF_THRESHOLD)
+        slot = [uploaded_file.name, detection_cache.get(cache_key), cache_key]
+        lane_results[direction].append(slot)
+        if slot[1] is None:
+            image = Image.open(uploaded_file).convert("RGB")
+            misses.append((slot, cache_key, np.array(image)))
 
+batch_stats = []
+if misses:
+    with provider.predict_lock:
+        results, batch_stats = predict_in_batches(provider.get(), [img_np for _, _, img_np in misses],
+                                                  batch_size=batch_size, conf=CONF_THRESHOLD)
+    for (slot, cache_key, _), result in zip(misses, results):
+        entry = (boxes_to_detections(result, provider.class_names), result.plot())
+        detection_cache.put(cache_key, *entry)
+        slot[1] = entry
+
+if any(lane_results.values()):
+    for idx, direction in enumerate(directions):
+        if not uploads[direction]:
+            continue
+        with cols[idx]:
+            detection_data = []
+            sources = []
+            for file_name, (cached_boxes, annotated_img), cache_key in lane_results[direction]:
                 # Show annotated image
-                st.image(annotated_img, caption=f"Detections in {direction}: {uploaded_file.name}", width='stretch')
-
-                # Extract boxes
-                boxes = results[0].boxes
-                if boxes is not None and len(boxes) > 0:
-                    for j, box in enumerate(boxes):
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = float(box.conf[0].cpu().numpy())
-                        cls_id = int(box.cls[0].cpu().numpy())
-                        cls_name = class_names[cls_id]
-                        
-                        detection_data.append({
-                            'id': len(st.session_state.all_detections[direction]) + len(detection_data),
-                            'class': cls_name,
-                            'confidence': round(conf, 2),
-                            'bbox': {
-                                'x1': float(x1),
-                                'y1': float(y1),
-                                'x2': float(x2),
-                                'y2': float(y2)
-                            }
-                        })
-                else:
-                    st.warning(f"No vehicles detected in {uploaded_file.name}.")
+                st.image(annotated_img, caption=f"Detections in {direction}: {file_name}", width='stretch')
+
+                # Number boxes after the ones already found in this lane
+                start_id = len(st.session_state.all_detections[direction]) + len(detection_data)
+                boxes = [dict(det, id=start_id + j) for j, det in enumerate(cached_boxes)]
+                if not boxes:
+                    st.warning(f"No vehicles detected in {file_name}.")
+                detection_data.extend(boxes)
+                sources.append(((file_name, cache_key), len(boxes)))
 
             st.session_state.all_detections[direction] = detection_data
+            st.session_state.detection_sources[direction] = sources
 
             st.write(f"**Found {len(detection_data)} vehicle(s) in total:**")
             for det in detection_data:
                 st.write(f"  • {det['class'].upper()} (Confidence: {det['confidence']})")
 
+if batch_stats:
+    total_images = sum(b['images'] for b in batch_stats)
+    total_seconds = sum(b['latency_ms'] for b in batch_stats) / 1000
+    with st.expander(f"⏱ Inference: {total_images} image(s) in {len(batch_stats)} batch(es), "
+                     f"{total_images / total_seconds if total_seconds > 0 else 0:.1f} images/s"):
+        st.dataframe(pd.DataFrame(batch_stats), hide_index=True)
+
+
+
+@st.fragment(run_every=1.0)
+def show_video_status():
+    """Live per-lane counts from the video pipeline, refreshed every second"""
+    pipeline = st.session_state.get("video_pipeline")
+    if pipeline is None:
+        st.info("Add a video or stream URL for at least one lane and press Start.")
+        return
+
+    # Latest frame's boxes become the lane's detections, same as uploaded images
+    status = pipeline.snapshot()
+    for direction, lane in status.items():
+        if lane['frame_index'] is not None:
+            st.session_state.all_detections[direction] = lane['detections']
+            st.session_state.detection_sources[direction] = [
+                (('video', pipeline.samplers[direction].source, lane['frame_index']), len(lane['detections']))]
+    status_cols = st.columns(4)
+    for idx, direction in enumerate(directions):
+        if direction not in status:
+            continue
+        lane = status[direction]
+        with status_cols[idx]:
+            if lane['error']:
+                st.error(lane['error'])
+                continue
+            st.metric(f"{direction.upper()} vehicles (rolling avg)", f"{lane['rolling_count']:.1f}",
+                      delta=f"{lane['latest_count']} in latest frame", delta_color="off")
+            if lane['annotated'] is not None:
+                st.image(lane['annotated'], caption=f"Frame {lane['frame_index']}", width='stretch')
+            st.caption(f"sampled {lane['frames_sampled']} · processed {lane['frames_processed']} · "
+                       f"dropped {lane['frames_dropped']}" + (" · finished" if lane['finished'] else ""))
+
+
+if input_mode == "Video":
+    start_col, stop_col = st.columns(2)
+    with start_col:
+        if st.button("Start video detection", width='stretch', disabled=not video_sources):
+            if not os.path.exists(MODEL_PATH):
+                st.warning(f"Model file '{MODEL_PATH}' not found - detection is disabled.")
+            else:
+                if st.session_state.get("video_pipeline") is not None:
+                    st.session_state.video_pipeline.stop()
+                # Frame numbers start over, so a new run's frames are new traffic
+                for direction in video_sources:
+                    st.session_state.streamed_sources[direction] = set()
+                st.session_state.video_pipeline = VideoDetectionPipeline(
+                    video_sources, provider, sample_fps=sample_fps, conf=CONF_THRESHOLD
+                ).start()
+    with stop_col:
+        if st.button("Stop", width='stretch') and st.session_state.get("video_pipeline") is not None:
+            stop_video_pipeline()
+    show_video_status()
+
+cache_stats = detection_cache.stats()
+st.sidebar.caption(f"Detection cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                   f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 2**20:.0f} MB) in memory")
+
 st.divider()
 
 # Display all detections summary
@@ -0,0 +1,93 @@
+"""
+Compare signal plans on identical detection inputs.
+
+Every plan gets a fresh Intersection that is fed the same detection file at
+t=0 and again every --repeat seconds, so load stays as unbalanced as the
+detections are (the sample data has 40/12/25/8 vehicles per approach).
+With --arrivals, every plan instead gets the same seeded synthetic traffic.
+Reports throughput and delay per plan.
+
+    python benchmarks/bench_policies.py --detections detected_vehicles.npz --sim-time 900 --repeat 90
+    python benchmarks/bench_policies.py --arrivals right=40,down=10,left=25,up=5 --seed 1 --sim-time 1800
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import simulation
+from detection_io import load_detection_file
+from traffic_generator import TrafficGenerator, parse_rates
+
+# name -> Intersection options; 'static' is the fixed defaultGreen plan of simulation_static_time.py
+PLANS = {
+    'static': {'timing': 'static'},
+    'round-robin': {'timing': 'dynamic', 'policy': 'round-robin'},
+    'max-pressure': {'timing': 'dynamic', 'policy': 'max-pressure'},
+    'actuated skip-empty': {'timing': 'actuated', 'policy': 'skip-empty'},
+    'actuated max-pressure': {'timing': 'actuated', 'policy': 'max-pressure'},
+}
+
+
+def run_plan(options, detections, sim_time, repeat, arrivals=None, seed=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        intersection = simulation.Intersection(verbose=False, **options)
+        if arrivals:
+            intersection.generator = TrafficGenerator(arrivals, seed=seed)
+        intersection.controller.start()
+        frameTime = 1.0 / simulation.framesPerSecond
+        for second in range(sim_time):
+            if detections is not None and (second == 0 or repeat and second % repeat == 0):
+                intersection.spawnDetections(detections)
+            for _ in range(simulation.framesPerSecond):
+                intersection.generateTraffic()
+                intersection.step(frameTime)
+            intersection.timeElapsed += 1
+    return intersection.collectMetrics()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark phase selection policies on the same detections")
+    parser.add_argument("--detections",
+                        help="detection file (.npz or .json; default: the first of simulation.detectionFiles "
+                             "that exists)")
+    parser.add_argument("--sim-time", type=int, default=900, help="simulated seconds per plan (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=90,
+                        help="re-queue the detections every N seconds, 0 for once (default: %(default)s)")
+    parser.add_argument("--arrivals", type=parse_rates, metavar="DIR=PER_MIN,...",
+                        help="use seeded synthetic arrivals instead of the detection file")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --arrivals (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.arrivals:
+        detections = None
+        print(f"Synthetic arrivals {args.arrivals} per minute, seed {args.seed}, {args.sim_time}s per plan\n")
+    else:
+        path = args.detections
+        if path is None:
+            # Same fallback as the simulation: the binary file, else the JSON export
+            found = [os.path.join(REPO_DIR, name) for name in simulation.detectionFiles
+                     if os.path.exists(os.path.join(REPO_DIR, name))]
+            if not found:
+                parser.error(f"none of {', '.join(simulation.detectionFiles)} found; pass --detections or --arrivals")
+            path = found[0]
+        detections = load_detection_file(path)
+        print(f"{len(detections)} detections {detections.counts()}, re-queued every {args.repeat}s, "
+              f"{args.sim_time}s per plan\n")
+    print(f"{'plan':24} {'crossed':>8} {'veh/s':>6} {'avg delay':>10} {'max delay':>10} {'waiting':>8}")
+    baseline = None
+    for name, options in PLANS.items():
+        m = run_plan(options, detections, args.sim_time, args.repeat, args.arrivals, args.seed)
+        baseline = baseline or m['vehicles_per_unit_time']
+        gain = (m['vehicles_per_unit_time'] / baseline - 1) * 100
+        print(f"{name:24} {m['total_crossed']:8d} {m['vehicles_per_unit_time']:6.3f} {m['avg_delay']:9.1f}s "
+              f"{m['max_delay']:9.1f}s {m['waiting_at_end']:8d}  {gain:+.1f}% vs static")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Timing benchmarks for the simulation and detection hot paths.
+
+    step            one moveVehicles() frame against vehicles queued at red
+    green_time      calculate_dynamic_green_time() against queue depth
+    spawn           Vehicle construction, fresh and from the retired pool
+    load_json/npz   detection file load against number of boxes
+    inference       YOLO images/s on CPU per batch size (needs ultralytics and best.pt)
+
+Results are written as JSON and can be compared with a stored baseline;
+the script exits with status 1 if any case got slower than the tolerance.
+
+    python benchmarks/bench_suite.py --out bench_results.json --compare benchmarks/baseline.json
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)
+
+import numpy as np
+
+import simulation
+from detection_io import export_json, load_detection_file, save_detections
+from traffic_generator import TrafficGenerator, arrivals_to_detections
+
+VEHICLE_COUNTS = (10, 100, 1000)
+QUEUE_DEPTHS = (10, 100, 1000)
+DETECTION_SIZES = (100, 1000, 10000, 100000)
+BATCH_SIZES = (1, 4, 8)
+
+
+def measure(fn, repeat=5, number=None, minRound=0.02, setup=None):
+    """
+    Median seconds per call of fn over repeat rounds of number calls. Without
+    number, rounds are sized to take at least minRound seconds so fast cases
+    are not dominated by timer noise. setup, if given, runs untimed before
+    every round.
+    """
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= minRound:
+                break
+            number *= 2
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times)
+
+
+def queued_intersection(count, directions=('right', 'down', 'left', 'up')):
+    """An Intersection with count vehicles queued round-robin over directions"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        intersection = simulation.Intersection(verbose=False)
+    for i in range(count):
+        intersection.spawnVehicle('car', directions[i % len(directions)])
+    intersection.controller.start()
+    return intersection
+
+
+def bench_step(results):
+    for count in VEHICLE_COUNTS:
+        intersection = queued_intersection(count)
+        # Held at red, so the queue is not drained while it is being measured
+        seconds = measure(lambda: intersection.moveVehicles(hold=True))
+        results[f"step.vehicles={count}"] = {'seconds': seconds, 'per_vehicle': seconds / count}
+
+
+def bench_green_time(results):
+    for depth in QUEUE_DEPTHS:
+        intersection = queued_intersection(depth, directions=('right',))
+        seconds = measure(lambda: intersection.calculate_dynamic_green_time('right'))
+        results[f"green_time.queue={depth}"] = {'seconds': seconds}
+
+
+def bench_spawn(results):
+    count = 1000
+    current = {}
+
+    def empty():
+        with contextlib.redirect_stdout(io.StringIO()):
+            current['intersection'] = simulation.Intersection(verbose=False)
+
+    def retired():
+        # count vehicles in the retired pool, so every measured spawn reuses one
+        empty()
+        intersection = current['intersection']
+        for vehicle in [intersection.spawnVehicle('car', 'right') for _ in range(count)]:
+            intersection.retireVehicle(vehicle)
+
+    def spawn():
+        current['intersection'].spawnVehicle('car', 'right')
+
+    results["spawn.fresh"] = {'seconds': measure(spawn, number=count, setup=empty)}
+    results["spawn.pooled"] = {'seconds': measure(spawn, number=count, setup=retired)}
+
+
+def bench_detection_load(results):
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in DETECTION_SIZES:
+            # Rates chosen so one minute of arrivals is about `size` boxes
+            generator = TrafficGenerator({d: size / 4 for d in ('right', 'down', 'left', 'up')}, seed=0)
+            detections = arrivals_to_detections(generator.poll(60.0))
+            json_path = os.path.join(tmp, f"d{size}.json")
+            npz_path = os.path.join(tmp, f"d{size}.npz")
+            export_json(json_path, detections)
+            save_detections(npz_path, detections)
+            for kind, path in (('json', json_path), ('npz', npz_path)):
+                # classes() forces a lane to be read, not just mapped
+                seconds = measure(lambda: load_detection_file(path).classes('right'), repeat=3)
+                results[f"load_{kind}.boxes={size}"] = {'seconds': seconds, 'bytes': os.path.getsize(path),
+                                                        'boxes': len(detections)}
+
+
+def bench_inference(results, weights="best.pt"):
+    if importlib.util.find_spec("ultralytics") is None:
+        results["inference"] = {'skipped': "ultralytics is not installed"}
+        return
+    if not os.path.exists(weights):
+        results["inference"] = {'skipped': f"{weights} not found"}
+        return
+    from detection import predict_in_batches
+    from model_provider import get_provider
+
+    model = get_provider(weights).get()
+    images = [np.random.default_rng(i).integers(0, 255, (640, 640, 3), dtype=np.uint8) for i in range(8)]
+    # Pinned to the CPU; without a device a CUDA machine would quietly measure its GPU
+    predict_in_batches(model, images[:1], batch_size=1, device='cpu')  # warm-up
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        predict_in_batches(model, images, batch_size=batch_size, device='cpu')
+        seconds = time.perf_counter() - start
+        results[f"inference.batch={batch_size}"] = {'seconds': seconds / len(images),
+                                                    'images_per_s': len(images) / seconds}
+
+
+BENCHMARKS = {
+    'step': bench_step,
+    'green_time': bench_green_time,
+    'spawn': bench_spawn,
+    'load': bench_detection_load,
+    'inference': bench_inference,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline per case; return the names of cases slower than tolerance allows"""
+    regressions = []
+    print(f"\n{'case':32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or 'seconds' not in current or 'seconds' not in before:
+            continue
+        change = current['seconds'] / before['seconds'] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:32} {before['seconds'] * 1e6:10.1f}us {current['seconds'] * 1e6:10.1f}us "
+              f"{change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and detection hot paths")
+    parser.add_argument("--only", nargs='+', choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a case counts as a regression (default: %(default)s)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        start = time.perf_counter()
+        BENCHMARKS[name](results)
+        print(f"{name}: {time.perf_counter() - start:.1f}s")
+
+    report = {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                 'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:32} skipped: {result['skipped']}")
+        else:
+            print(f"{name:32} {result['seconds'] * 1e6:10.1f}us")
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions over {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
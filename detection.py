@@ -0,0 +1,86 @@
+import os
+import time
+
+
+def boxes_to_detections(result, class_names, start_id=0):
+    """Convert one YOLO result into the detection dicts written for the simulation"""
+    detections = []
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return detections
+
+    xyxy = boxes.xyxy.cpu().numpy()
+    confs = boxes.conf.cpu().numpy()
+    cls_ids = boxes.cls.cpu().numpy().astype(int)
+    for j in range(len(xyxy)):
+        x1, y1, x2, y2 = xyxy[j]
+        detections.append({
+            'id': start_id + j,
+            'class': class_names[cls_ids[j]],
+            'confidence': round(float(confs[j]), 2),
+            'bbox': {
+                'x1': float(x1),
+                'y1': float(y1),
+                'x2': float(x2),
+                'y2': float(y2)
+            }
+        })
+    return detections
+
+
+def predict_in_batches(model, images, batch_size=8, conf=0.5, device=None):
+    """
+    Run model.predict over a list of images, batch_size images per call, on
+    device ('cpu', '0', ...; None lets the model pick).
+
+    Returns (results, batch_stats) where results[i] is the YOLO result for
+    images[i] and batch_stats has one dict per predict call with its size,
+    latency and throughput.
+    """
+    results = []
+    batch_stats = []
+    batch_size = max(1, int(batch_size))
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        t0 = time.perf_counter()
+        batch_results = model.predict(batch, conf=conf, batch=len(batch), device=device, verbose=False)
+        latency = time.perf_counter() - t0
+        results.extend(batch_results)
+        batch_stats.append({
+            'batch': len(batch_stats) + 1,
+            'images': len(batch),
+            'latency_ms': round(latency * 1000, 1),
+            'images_per_s': round(len(batch) / latency, 2) if latency > 0 else float('inf')
+        })
+    return results, batch_stats
+
+
+def detect_lane_images(image_dir, provider, directions=('right', 'down', 'left', 'up'),
+                       batch_size=8, conf=0.5):
+    """
+    Run detection on image_dir/<direction>/* for every lane.
+
+    Returns {direction: [detection dicts]} in the same shape app.py saves
+    to detected_vehicles.json.
+    """
+    image_types = ('.jpg', '.jpeg', '.png')
+    jobs = []
+    for direction in directions:
+        lane_dir = os.path.join(image_dir, direction)
+        if not os.path.isdir(lane_dir):
+            continue
+        for name in sorted(os.listdir(lane_dir)):
+            if name.lower().endswith(image_types):
+                jobs.append((direction, os.path.join(lane_dir, name)))
+
+    detections = {direction: [] for direction in directions}
+    if not jobs:
+        return detections
+
+    with provider.predict_lock:
+        results, _ = predict_in_batches(provider.get(), [path for _, path in jobs],
+                                        batch_size=batch_size, conf=conf)
+    for (direction, _), result in zip(jobs, results):
+        detections[direction].extend(boxes_to_detections(result, provider.class_names,
+                                                         start_id=len(detections[direction])))
+    return detections
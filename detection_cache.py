@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_weights_hashes = {}
+
+
+def weights_sha256(path):
+    """SHA-256 of a model weights file, computed once per (path, size, mtime)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _weights_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _weights_hashes[key] = digest.hexdigest()
+    return _weights_hashes[key]
+
+
+class DetectionCache:
+    """
+    LRU cache of detection results keyed by image content, model weights and
+    confidence threshold.
+
+    Each entry holds the detection dicts for one image (ids starting at 0) and
+    the annotated image. Entries are kept in memory up to max_bytes of
+    annotated images and, when cache_dir is set, also written to disk as .npz
+    files so they survive a server restart. The disk cache is kept under
+    max_disk_bytes by removing the files least recently written or read.
+    """
+
+    def __init__(self, max_bytes=256 << 20, cache_dir=None, max_disk_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, weights_hash, conf):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}-{weights_hash[:16]}-{conf:.3f}"
+
+    def get(self, key):
+        """Return (detections, annotated_image) or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key, detections, annotated):
+        entry = (detections, annotated)
+        with self.lock:
+            self._insert(key, entry)
+        self._write_disk(key, entry)
+
+    @staticmethod
+    def _size(entry):
+        return np.asarray(entry[1]).nbytes
+
+    def _insert(self, key, entry):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= self._size(previous)
+        self.entries[key] = entry
+        self.bytes += self._size(entry)
+        # The newest entry stays even if it alone is over the limit
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= self._size(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _read_disk(self, key):
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with np.load(self._path(key)) as data:
+                detections = json.loads(str(data["detections"]))
+                annotated = data["annotated"]
+            # Recently read files are the last to be pruned
+            os.utime(self._path(key))
+            return detections, annotated
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        detections, annotated = entry
+        tmp_path = self._path(key) + ".tmp.npz"
+        try:
+            np.savez_compressed(tmp_path, detections=np.array(json.dumps(detections)),
+                                annotated=np.asarray(annotated))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the least recently used cache files until the directory is under max_disk_bytes"""
+        try:
+            files = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(self.cache_dir) if entry.is_file() and entry.name.endswith(".npz")]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'bytes': self.bytes}
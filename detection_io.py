@@ -0,0 +1,245 @@
+import json
+import os
+import struct
+import time
+import zipfile
+
+import numpy as np
+
+# One row per detected box; lanes are stored back to back and indexed by lane_offsets
+DETECTION_DTYPE = np.dtype([
+    ('class_id', '<u2'),
+    ('confidence', '<f4'),
+    ('bbox', '<f4', (4,)),
+])
+
+_ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+# Streamed batch: magic, write time, record count, metadata length; then JSON metadata and raw records
+_STREAM_MAGIC = b'DTB1'
+_STREAM_HEADER = struct.Struct('<4sdII')
+
+
+class DetectionSet:
+    """
+    Per-lane detections held as one structured array.
+
+    records[lane_offsets[i]:lane_offsets[i+1]] are the boxes of directions[i];
+    class_id indexes class_names. When loaded from .npz the records are a
+    read-only memory map of the file, so lane() views cost no copy or parse.
+    """
+
+    def __init__(self, records, lane_offsets, directions, class_names):
+        self.records = records
+        self.lane_offsets = np.asarray(lane_offsets, dtype=np.int64)
+        self.directions = [str(d) for d in directions]
+        self.class_names = [str(c) for c in class_names]
+
+    def __len__(self):
+        return len(self.records)
+
+    def lane(self, direction):
+        """Structured array view of the boxes detected for a direction"""
+        if direction not in self.directions:
+            return self.records[:0]
+        i = self.directions.index(direction)
+        return self.records[self.lane_offsets[i]:self.lane_offsets[i + 1]]
+
+    def classes(self, direction):
+        """Class names of the boxes detected for a direction, in order"""
+        return [self.class_names[c] for c in self.lane(direction)['class_id'].tolist()]
+
+    def counts(self):
+        return {direction: len(self.lane(direction)) for direction in self.directions}
+
+    @classmethod
+    def from_dict(cls, detections):
+        """Build from the {direction: [detection dicts]} shape app.py keeps in session state"""
+        class_ids = {}
+        directions = list(detections.keys())
+        lane_offsets = [0]
+        rows = []
+        for direction in directions:
+            for det in detections[direction]:
+                class_id = class_ids.setdefault(det.get('class', 'car'), len(class_ids))
+                bbox = det.get('bbox', {})
+                rows.append((class_id, det.get('confidence', 0.0),
+                             (bbox.get('x1', 0.0), bbox.get('y1', 0.0), bbox.get('x2', 0.0), bbox.get('y2', 0.0))))
+            lane_offsets.append(len(rows))
+        records = np.array(rows, dtype=DETECTION_DTYPE)
+        return cls(records, lane_offsets, directions, list(class_ids))
+
+    def to_dict(self):
+        """Back to the JSON-friendly {direction: [detection dicts]} shape"""
+        detections = {}
+        for direction in self.directions:
+            lane = self.lane(direction)
+            detections[direction] = [{
+                'id': j,
+                'class': self.class_names[int(row['class_id'])],
+                'confidence': round(float(row['confidence']), 2),
+                'bbox': dict(zip(('x1', 'y1', 'x2', 'y2'), (float(v) for v in row['bbox'])))
+            } for j, row in enumerate(lane)]
+        return detections
+
+
+def save_detections(path, detections):
+    """Write detections (DetectionSet or dict) as an uncompressed .npz, atomically"""
+    if not isinstance(detections, DetectionSet):
+        detections = DetectionSet.from_dict(detections)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        # Uncompressed so the records member can be memory-mapped in place
+        np.savez(f,
+                 records=np.ascontiguousarray(detections.records, dtype=DETECTION_DTYPE),
+                 lane_offsets=detections.lane_offsets,
+                 directions=np.array(detections.directions),
+                 class_names=np.array(detections.class_names))
+    os.replace(tmp_path, path)
+
+
+def _mmap_npz_member(path, name):
+    """Memory-map an uncompressed array stored inside an .npz file"""
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        name_length, extra_length = header[-2], header[-1]
+        f.seek(info.header_offset + _ZIP_LOCAL_HEADER.size + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def load_detections(path, mmap=True):
+    """Read a detections .npz; records are memory-mapped unless mmap is False"""
+    with np.load(path) as data:
+        lane_offsets = data['lane_offsets']
+        directions = data['directions'].tolist()
+        class_names = data['class_names'].tolist()
+        records = None if mmap else data['records']
+    if records is None:
+        records = _mmap_npz_member(path, 'records.npy')
+        if records is None:
+            with np.load(path) as data:
+                records = data['records']
+    return DetectionSet(records, lane_offsets, directions, class_names)
+
+
+def load_detection_file(path):
+    """Load .npz (binary) or .json detections into a DetectionSet"""
+    if path.endswith(".npz"):
+        return load_detections(path)
+    with open(path, "r") as f:
+        return DetectionSet.from_dict(json.load(f))
+
+
+def export_json(path, detections, indent=2):
+    """Write detections in the original detected_vehicles.json layout"""
+    if isinstance(detections, DetectionSet):
+        detections = detections.to_dict()
+    with open(path, "w") as f:
+        json.dump(detections, f, indent=indent)
+
+
+def append_detection_batch(path, detections):
+    """
+    Append one batch of detections to an append-only stream file.
+
+    The batch is written with a single write call so a reader sees either
+    nothing or a complete header; readers also wait for the full payload.
+    """
+    if not isinstance(detections, DetectionSet):
+        detections = DetectionSet.from_dict(detections)
+    meta = json.dumps({
+        'directions': detections.directions,
+        'lane_offsets': detections.lane_offsets.tolist(),
+        'class_names': detections.class_names,
+    }).encode('utf-8')
+    records = np.ascontiguousarray(detections.records, dtype=DETECTION_DTYPE).tobytes()
+    header = _STREAM_HEADER.pack(_STREAM_MAGIC, time.time(), len(detections), len(meta))
+    with open(path, "ab") as f:
+        f.write(header + meta + records)
+
+
+class DetectionStreamReader:
+    """
+    Incremental reader for a file written by append_detection_batch().
+
+    poll() returns the batches appended since the last call as
+    (DetectionSet, written_at) pairs. The reader starts at the current end
+    of the file unless from_start is set, and starts over if the file is
+    truncated, removed or replaced by a new one (app.py's Clear button
+    followed by a save). Bytes that do not start a batch are skipped up to
+    the next batch header, so a reader that lost its place never stops the
+    simulation.
+    """
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.offset = 0
+        # Device, inode and first batch header of the file read so far; a file recreated
+        # under a reused inode still has a different first header (it holds the write time)
+        self.identity = None
+        # Bytes skipped while looking for a batch header
+        self.skipped = 0
+        if not from_start and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.identity = self._identity(f)
+                self.offset = os.fstat(f.fileno()).st_size
+
+    @staticmethod
+    def _identity(f):
+        stat = os.fstat(f.fileno())
+        f.seek(0)
+        return stat.st_dev, stat.st_ino, f.read(_STREAM_HEADER.size)
+
+    def poll(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            self.offset = 0
+            self.identity = None
+            return []
+        if size == self.offset:
+            return []
+
+        batches = []
+        with open(self.path, "rb") as f:
+            identity = self._identity(f)
+            if identity != self.identity or size < self.offset:
+                self.offset = 0
+                self.identity = identity
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        pos = 0
+        while len(data) - pos >= _STREAM_HEADER.size:
+            magic, written_at, count, meta_length = _STREAM_HEADER.unpack_from(data, pos)
+            if magic != _STREAM_MAGIC:
+                # Not at a batch boundary (the file was recreated under the same inode); resync
+                found = data.find(_STREAM_MAGIC, pos + 1)
+                resync = found if found >= 0 else max(pos + 1, len(data) - len(_STREAM_MAGIC) + 1)
+                self.skipped += resync - pos
+                pos = resync
+                continue
+            end = pos + _STREAM_HEADER.size + meta_length + count * DETECTION_DTYPE.itemsize
+            if end > len(data):
+                break  # Batch still being written
+            meta_start = pos + _STREAM_HEADER.size
+            meta = json.loads(data[meta_start:meta_start + meta_length].decode('utf-8'))
+            records = np.frombuffer(data, dtype=DETECTION_DTYPE, count=count, offset=meta_start + meta_length)
+            batches.append((DetectionSet(records, meta['lane_offsets'], meta['directions'], meta['class_names']),
+                            written_at))
+            pos = end
+        self.offset += pos
+        return batches
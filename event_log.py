@@ -0,0 +1,215 @@
+"""
+Buffered structured log of simulation events.
+
+EventLog.emit() only appends a tuple to an in-memory queue; a background
+thread drains it every flushInterval seconds and writes the events either
+as JSON lines (.jsonl) or as fixed-size binary records (any other
+extension). Events carry the simulated time:
+
+    green   signal turned green          direction, value = planned green seconds
+    yellow  signal turned yellow         direction, value = green served, reason
+    spawn   vehicle queued on approach   direction, lane, class, slot, source
+    cross   vehicle crossed stop line    direction, lane, class, slot, value = delay seconds
+
+level 'phases' logs green/yellow only, 'vehicles' also logs spawns and
+crossings. The file can be read back with read_events(), or from the
+command line:
+
+    python event_log.py summary run.evl
+    python event_log.py replay run.jsonl --kind green yellow --from 60 --to 120
+"""
+import argparse
+import collections
+import json
+import struct
+import sys
+import threading
+
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('kind', 'u1'),
+    ('direction', 'i1'),
+    ('lane', 'i1'),
+    ('vehicleClass', 'i1'),
+    ('slot', '<i4'),
+    ('value', '<f4'),
+    ('code', 'i1'),
+])
+
+# kind -> (minimum level, name of the value column, name of the code column and its labels)
+KINDS = {
+    'green': (1, 'green', None),
+    'yellow': (1, 'served', ('reason', ('timed', 'gapOut', 'maxOut'))),
+    'spawn': (2, None, ('source', ('detection', 'generated'))),
+    'cross': (2, 'delay', None),
+}
+kindNames = list(KINDS)
+kindIds = {name: i for i, name in enumerate(kindNames)}
+LEVELS = {'phases': 1, 'vehicles': 2}
+
+# Binary file: magic, metadata length; then JSON metadata and EVENT_DTYPE records until EOF
+_MAGIC = b'EVL1'
+_HEADER = struct.Struct('<4sI')
+
+
+class EventLog:
+    """
+    directions and classes name the integer direction and vehicleClass
+    columns. emit() is safe to call from any thread and never touches the
+    file; close() writes whatever is still queued.
+    """
+
+    def __init__(self, path, directions, classes, level='vehicles', flushInterval=0.5):
+        self.path = path
+        self.directions = list(directions)
+        self.classes = list(classes)
+        self.level = LEVELS[level]
+        self.binary = not path.endswith('.jsonl')
+        self.flushInterval = flushInterval
+        self.queue = collections.deque()
+        self.written = 0
+        self.file = open(path, 'wb' if self.binary else 'w')
+        if self.binary:
+            meta = json.dumps({'kinds': kindNames, 'directions': self.directions,
+                               'classes': self.classes}).encode('utf-8')
+            self.file.write(_HEADER.pack(_MAGIC, len(meta)) + meta)
+        self.closed = threading.Event()
+        self.writer = threading.Thread(name="event-log", target=self._run, daemon=True)
+        self.writer.start()
+
+    def logs(self, kind):
+        """Whether events of this kind are recorded at the configured level"""
+        return KINDS[kind][0] <= self.level
+
+    def emit(self, kind, t, direction=-1, lane=-1, vehicleClass=-1, slot=-1, value=0.0, code=0):
+        if self.logs(kind):
+            self.queue.append((t, kindIds[kind], direction, lane, vehicleClass, slot, value, code))
+
+    def _run(self):
+        while not self.closed.wait(self.flushInterval):
+            self.flush()
+
+    def flush(self):
+        """Write out everything queued so far (normally called by the writer thread)"""
+        batch = []
+        try:
+            while True:
+                batch.append(self.queue.popleft())
+        except IndexError:
+            pass
+        if not batch:
+            return
+        records = np.array(batch, dtype=EVENT_DTYPE)
+        if self.binary:
+            self.file.write(records.tobytes())
+        else:
+            self.file.write(''.join(json.dumps(event) + '\n' for event in
+                                    decode(records, self.directions, self.classes)))
+        self.file.flush()
+        self.written += len(records)
+
+    def close(self):
+        """Stop the writer thread and write the remaining events"""
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        self.writer.join()
+        self.flush()
+        self.file.close()
+
+
+def decode(records, directions, classes):
+    """EVENT_DTYPE records as dicts with named kinds, directions and classes"""
+    events = []
+    for t, kind, direction, lane, vehicleClass, slot, value, code in records.tolist():
+        name = kindNames[kind]
+        _, valueName, codeField = KINDS[name]
+        event = {'t': round(t, 3), 'event': name, 'direction': directions[direction]}
+        if name in ('spawn', 'cross'):
+            event.update({'lane': lane, 'class': classes[vehicleClass], 'slot': slot})
+        if valueName:
+            event[valueName] = round(value, 3)
+        if codeField:
+            event[codeField[0]] = codeField[1][code]
+        events.append(event)
+    return events
+
+
+def read_events(path):
+    """All events in a log written by EventLog, as dicts in the order they were emitted"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(_MAGIC)] != _MAGIC:
+        return [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+    _, metaLength = _HEADER.unpack_from(data)
+    meta = json.loads(data[_HEADER.size:_HEADER.size + metaLength].decode('utf-8'))
+    start = _HEADER.size + metaLength
+    count = (len(data) - start) // EVENT_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=EVENT_DTYPE, count=count, offset=start)
+    return decode(records, meta['directions'], meta['classes'])
+
+
+def summarize(events):
+    """Phase, spawn and crossing totals per direction"""
+    summary = collections.OrderedDict()
+    for event in events:
+        row = summary.setdefault(event['direction'], {'greens': 0, 'yellows': 0, 'greenServed': 0.0,
+                                                      'gapOut': 0, 'maxOut': 0, 'spawned': 0, 'crossed': 0,
+                                                      'delayTotal': 0.0, 'delayMax': 0.0})
+        kind = event['event']
+        if kind == 'green':
+            row['greens'] += 1
+        elif kind == 'yellow':
+            row['yellows'] += 1
+            row['greenServed'] += event['served']
+            if event['reason'] != 'timed':
+                row[event['reason']] += 1
+        elif kind == 'spawn':
+            row['spawned'] += 1
+        elif kind == 'cross':
+            row['crossed'] += 1
+            row['delayTotal'] += event['delay']
+            row['delayMax'] = max(row['delayMax'], event['delay'])
+    return summary
+
+
+def format_event(event):
+    details = ' '.join(f"{key}={value}" for key, value in event.items() if key not in ('t', 'event', 'direction'))
+    return f"{event['t']:10.2f}  {event['event']:6} {event['direction']:5} {details}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or replay a simulation event log")
+    parser.add_argument("command", choices=['summary', 'replay'])
+    parser.add_argument("path", help="event log written with simulation.py --event-log")
+    parser.add_argument("--kind", nargs='+', choices=kindNames, help="replay only these events")
+    parser.add_argument("--direction", nargs='+', help="replay only these directions")
+    parser.add_argument("--from", dest="start", type=float, default=0.0, help="replay from this simulated second")
+    parser.add_argument("--to", dest="end", type=float, default=float('inf'), help="replay up to this simulated second")
+    args = parser.parse_args(argv)
+
+    events = read_events(args.path)
+    if args.command == 'replay':
+        for event in events:
+            if (args.start <= event['t'] <= args.end and (not args.kind or event['event'] in args.kind)
+                    and (not args.direction or event['direction'] in args.direction)):
+                print(format_event(event))
+        return
+
+    span = events[-1]['t'] - events[0]['t'] if events else 0.0
+    counts = collections.Counter(event['event'] for event in events)
+    print(f"{len(events)} events over {span:.1f} simulated seconds: "
+          + ', '.join(f"{counts[kind]} {kind}" for kind in kindNames))
+    print(f"\n{'direction':10} {'greens':>6} {'avg green':>10} {'gap-out':>8} {'max-out':>8} "
+          f"{'spawned':>8} {'crossed':>8} {'avg delay':>10} {'max delay':>10}")
+    for direction, row in summarize(events).items():
+        avgGreen = row['greenServed'] / row['yellows'] if row['yellows'] else 0.0
+        avgDelay = row['delayTotal'] / row['crossed'] if row['crossed'] else 0.0
+        print(f"{direction:10} {row['greens']:6d} {avgGreen:9.1f}s {row['gapOut']:8d} {row['maxOut']:8d} "
+              f"{row['spawned']:8d} {row['crossed']:8d} {avgDelay:9.1f}s {row['delayMax']:9.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
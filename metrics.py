@@ -0,0 +1,209 @@
+"""
+Low-overhead metrics registry.
+
+Summaries take raw observations (usually seconds from time.perf_counter()
+deltas) and keep count, total, max and a fixed-size ring of recent samples
+for percentiles. Counters and gauges are plain numbers. Series append one
+row per sample interval (e.g. per-approach queue length every simulated
+second) into a bounded deque.
+
+The registry can be dumped to JSON or CSV, rendered in the Prometheus text
+format, or served on a local HTTP endpoint:
+
+    registry = MetricsRegistry()
+    frame = registry.summary('frame_seconds', 'Render loop frame time')
+    t0 = time.perf_counter(); ...; frame.observe(time.perf_counter() - t0)
+    registry.serve(9108)  # http://localhost:9108/metrics
+"""
+import csv
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Summary:
+    def __init__(self, name, help="", window=1024):
+        self.name = name
+        self.help = help
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = np.zeros(window)
+
+    def observe(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantiles(self):
+        """QUANTILES over the most recent window of observations"""
+        recent = self.samples[:min(self.count, len(self.samples))]
+        if not len(recent):
+            return {q: 0.0 for q in QUANTILES}
+        return dict(zip(QUANTILES, np.quantile(recent, QUANTILES).tolist()))
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.total, 'max': self.max,
+                'mean': self.total / self.count if self.count else 0.0,
+                **{f'p{int(q * 100)}': v for q, v in self.quantiles().items()}}
+
+
+class MetricsRegistry:
+    def __init__(self, seriesLength=86400):
+        self.lock = threading.Lock()
+        self.summaries = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {}
+        self.series = {}
+        self.seriesLength = seriesLength
+        self.server = None
+
+    def summary(self, name, help="", window=1024):
+        """Get or create the Summary called name"""
+        with self.lock:
+            if name not in self.summaries:
+                self.summaries[name] = Summary(name, help, window)
+            return self.summaries[name]
+
+    def inc(self, name, amount=1, help=""):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if help:
+                self.help[name] = help
+
+    def set(self, name, value, help=""):
+        with self.lock:
+            self.gauges[name] = value
+            if help:
+                self.help[name] = help
+
+    def record(self, series, row):
+        """Append a row (dict of column -> value) to a time series"""
+        with self.lock:
+            if series not in self.series:
+                self.series[series] = deque(maxlen=self.seriesLength)
+            self.series[series].append(row)
+
+    def snapshot(self):
+        with self.lock:
+            summaries = dict(self.summaries)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            series = {name: list(rows) for name, rows in self.series.items()}
+        return {
+            'summaries': {name: s.snapshot() for name, s in summaries.items()},
+            'counters': counters,
+            'gauges': gauges,
+            'series': series,
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dump_csv(self, path):
+        """
+        Summaries, counters and gauges as name,field,value rows in path, and
+        each series in <path stem>.<series>.csv next to it.
+        """
+        snapshot = self.snapshot()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'field', 'value'])
+            for name, fields in snapshot['summaries'].items():
+                for field, value in fields.items():
+                    writer.writerow([name, field, value])
+            for kind in ('counters', 'gauges'):
+                for name, value in snapshot[kind].items():
+                    writer.writerow([name, kind[:-1], value])
+        stem = path[:-4] if path.endswith('.csv') else path
+        for name, rows in snapshot['series'].items():
+            if not rows:
+                continue
+            with open(f"{stem}.{name}.csv", 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for row in rows for k in row)))
+                writer.writeheader()
+                writer.writerows(rows)
+
+    def dump(self, path):
+        """JSON or CSV, by extension"""
+        if path.endswith('.csv'):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+    def render_prometheus(self, prefix="traffic_"):
+        """Current values in the Prometheus text exposition format (latest row of each series as gauges)"""
+        # The simulation keeps registering and updating metrics while this runs on the HTTP thread
+        with self.lock:
+            summaries = dict(self.summaries)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            help = dict(self.help)
+            latest = {name: rows[-1] for name, rows in self.series.items() if rows}
+        lines = []
+        for name, s in summaries.items():
+            metric = prefix + name
+            lines.append(f"# HELP {metric} {s.help or name}")
+            lines.append(f"# TYPE {metric} summary")
+            for q, value in s.quantiles().items():
+                lines.append(f'{metric}{{quantile="{q}"}} {value:.9g}')
+            lines.append(f"{metric}_sum {s.total:.9g}")
+            lines.append(f"{metric}_count {s.count}")
+            # A summary family only has quantile, _sum and _count samples; the max is a gauge of its own
+            lines.append(f"# HELP {metric}_max Largest observation of {metric}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.append(f"{metric}_max {s.max:.9g}")
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name, value in values.items():
+                metric = prefix + name
+                lines.append(f"# HELP {metric} {help.get(name, name)}")
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric} {value:.9g}")
+        for name, row in latest.items():
+            # Series rows look like {'t': 12, 'queue_right': 4, ...}; label by the part after the first '_'
+            for column, value in row.items():
+                if column == 't' or not isinstance(value, (int, float)):
+                    continue
+                field, _, label = column.partition('_')
+                metric = f"{prefix}{name}_{field}"
+                lines.append(f'{metric}{{approach="{label}"}} {value:.9g}' if label else f"{metric} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve render_prometheus() at http://host:port/metrics from a daemon thread"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(name="metrics-http", target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def close(self):
+        """Stop serving, if serve() was called"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,54 @@
+import threading
+
+DEFAULT_WEIGHTS = "best.pt"
+
+
+class ModelProvider:
+    """
+    Lazily loaded YOLO model shared by everything in the process.
+
+    Nothing from ultralytics/torch is imported until get() is first called.
+    The Streamlit server runs every session in the same process, so all
+    sessions share one loaded model; other processes (the simulation, sweep
+    workers) each load their own copy only when they actually detect.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS):
+        self.weights = weights
+        self.model = None
+        self.load_lock = threading.Lock()
+        # Ultralytics predictors keep per-call state, so predictions are serialized
+        self.predict_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def get(self):
+        """Return the model, loading the weights on first use"""
+        if self.model is None:
+            with self.load_lock:
+                if self.model is None:
+                    from ultralytics import YOLO
+                    self.model = YOLO(self.weights)
+        return self.model
+
+    @property
+    def class_names(self):
+        return self.get().names
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(weights=DEFAULT_WEIGHTS):
+    """Process-wide ModelProvider for a weights file"""
+    with _providers_lock:
+        if weights not in _providers:
+            _providers[weights] = ModelProvider(weights)
+        return _providers[weights]
+
+
+def get_model(weights=DEFAULT_WEIGHTS):
+    return get_provider(weights).get()
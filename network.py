@@ -0,0 +1,288 @@
+"""
+Road network of connected intersections.
+
+Each junction is a simulation.Intersection. Links connect one junction's exit
+in a direction to the approach of the same direction at another junction.
+A vehicle that crosses a linked stop line is handed off after the link's
+travel time and joins the back of the next approach queue. Vehicles leaving
+on an unlinked direction exit the network.
+
+    python network.py --grid 6x6 --travel-time 20 --green-wave right --sim-time 600
+    python network.py --corridor 8 --detections detected_vehicles.npz
+"""
+import argparse
+import functools
+import heapq
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import simulation
+from detection_io import load_detection_file
+from phase_policy import RoundRobin, policies
+from timing_strategy import strategies
+from simulation import Intersection, directionIndex, directionNumbers, timingClasses
+
+# Grid offset of the next junction when leaving in each direction (row, column)
+directionSteps = {'right': (0, 1), 'down': (1, 0), 'left': (0, -1), 'up': (-1, 0)}
+
+
+def approachTime(direction, vehicleClass='car'):
+    """Free-flow seconds from an approach's spawn point to its stop line"""
+    horizontal = direction in ('right', 'left')
+    spawn = (simulation.x if horizontal else simulation.y)[direction][1]
+    speed = simulation.speeds[vehicleClass] * simulation.framesPerSecond
+    return abs(simulation.stopLines[direction] - spawn) / speed
+
+
+class Link:
+    def __init__(self, source, direction, target, travelTime):
+        self.source = source
+        self.direction = direction
+        self.target = target
+        self.travelTime = travelTime
+
+
+class Network:
+    """
+    Intersections joined by links, stepped together on one simulated clock.
+
+    All junctions advance frame by frame in lockstep. Handoffs wait in a heap
+    ordered by arrival time, so the cost per frame does not depend on how many
+    vehicles are in transit. offsets delays each junction's first green by
+    that many seconds; until then all of its approaches are held on red,
+    while its controller clock still follows the network clock. firstGreens
+    names the signal a junction's ring starts on (signal 0 otherwise).
+    """
+
+    def __init__(self, intersections, links=(), offsets=None):
+        self.intersections = list(intersections)
+        self.links = {}
+        for link in links:
+            self.addLink(link)
+        self.offsets = dict(offsets or {})
+        self.firstGreens = {}
+        self.clock = 0.0
+        self.timeElapsed = 0
+        self.started = set()
+        self.inTransit = []
+        self.handoffCount = 0
+        self.stats = {'entered': 0, 'handedOff': 0, 'exited': 0}
+
+    def addLink(self, link):
+        self.links[(link.source, link.direction)] = link
+        link.source.downstreamQueues = functools.partial(self.downstreamQueues, link.source)
+
+    def downstreamQueues(self, intersection):
+        """Vehicles waiting on the approach each of intersection's exits leads to (0 for unlinked exits)"""
+        queues = [0] * len(directionNumbers)
+        for i, direction in directionNumbers.items():
+            link = self.links.get((intersection, direction))
+            if link is not None:
+                queues[i] = int(link.target.vehicleState.waiting[i].sum())
+        return queues
+
+    def entryApproaches(self):
+        """(intersection, direction) pairs with no incoming link, where traffic enters the network"""
+        linked = {(link.target, link.direction) for link in self.links.values()}
+        return [(intersection, direction) for intersection in self.intersections
+                for direction in directionNumbers.values() if (intersection, direction) not in linked]
+
+    def seed(self, detections):
+        """Queue a detection set on every entry approach"""
+        for intersection, direction in self.entryApproaches():
+            if direction not in detections.directions:
+                continue
+            for vehicleClass in detections.classes(direction):
+                intersection.spawnVehicle(vehicleClass, direction)
+                self.stats['entered'] += 1
+
+    def greenWave(self, route, direction):
+        """
+        Offset each junction of route (in order of travel) so its green for
+        direction starts when a platoon released by the previous green
+        arrives: link travel time plus the drive from spawn to stop line.
+
+        Every junction's ring starts on direction, and the wave only holds
+        beyond the first cycle if all of them repeat the same cycle, so the
+        route must use static timing, round robin and equal signal times.
+        """
+        cycles = {intersection: self.cycleTime(intersection) for intersection in route}
+        if None in cycles.values() or len(set(cycles.values())) > 1:
+            raise ValueError("a green wave needs static timing with round robin and the same green and yellow "
+                             "times at every junction")
+        for intersection in route:
+            self.firstGreens[intersection] = directionIndex[direction]
+        offset = self.offsets.get(route[0], 0.0)
+        self.offsets[route[0]] = offset
+        for source, target in zip(route, route[1:]):
+            link = self.links[(source, direction)]
+            if link.target is not target:
+                raise ValueError(f"{source.name} is not linked to {target.name} going {direction}")
+            offset += link.travelTime + approachTime(direction)
+            self.offsets[target] = offset
+
+    @staticmethod
+    def cycleTime(intersection):
+        """Seconds between two greens of the same signal, or None if the cycle is not fixed"""
+        if intersection.timing.name != 'static' or not isinstance(intersection.controller.policy, RoundRobin):
+            return None
+        return len(intersection.signals) * (intersection.defaultGreen + intersection.defaultYellow)
+
+    def start(self):
+        self._startDue()
+
+    def _startDue(self):
+        for intersection in self.intersections:
+            if intersection not in self.started and self.clock >= self.offsets.get(intersection, 0.0) - 1e-9:
+                intersection.controller.start(self.firstGreens.get(intersection))
+                self.started.add(intersection)
+
+    def step(self, dt):
+        """Advance every junction one frame, then deliver handoffs that have arrived"""
+        for intersection in self.intersections:
+            if intersection in self.started:
+                crossedSlots = intersection.step(dt)
+            else:
+                crossedSlots = intersection.moveVehicles(hold=True)
+            if len(crossedSlots):
+                self._leave(intersection, crossedSlots)
+        self.clock += dt
+        # Held junctions keep their controller clock on network time, so spawn and crossing
+        # times (and with them delays) count the hold
+        for intersection in self.intersections:
+            if intersection not in self.started:
+                intersection.controller.clock = self.clock
+        self._startDue()
+
+        while self.inTransit and self.inTransit[0][0] <= self.clock:
+            _, _, target, vehicleClass, direction = heapq.heappop(self.inTransit)
+            target.spawnVehicle(vehicleClass, direction, is_detected=False)
+
+    def _leave(self, intersection, crossedSlots):
+        state = intersection.vehicleState
+        for slot in crossedSlots:
+            direction = directionNumbers[int(state.direction[slot])]
+            link = self.links.get((intersection, direction))
+            if link is None:
+                self.stats['exited'] += 1
+                continue
+            vehicleClass = timingClasses[int(state.vehicleClass[slot])]
+            # handoffCount breaks arrival-time ties in FIFO order
+            self.handoffCount += 1
+            heapq.heappush(self.inTransit, (self.clock + link.travelTime, self.handoffCount,
+                                            link.target, vehicleClass, direction))
+            self.stats['handedOff'] += 1
+
+    def runHeadless(self, duration):
+        """Run for duration simulated seconds at simulation.framesPerSecond; returns collectMetrics()"""
+        frameTime = 1.0 / simulation.framesPerSecond
+        self.start()
+        wallStart = time.perf_counter()
+        for _ in range(duration):
+            for _ in range(simulation.framesPerSecond):
+                self.step(frameTime)
+            self.timeElapsed += 1
+            for intersection in self.intersections:
+                intersection.timeElapsed += 1
+        metrics = self.collectMetrics()
+        metrics['wall_time'] = time.perf_counter() - wallStart
+        return metrics
+
+    def collectMetrics(self):
+        """Network totals plus one collectMetrics() row per junction under 'intersections'"""
+        metrics = dict(self.stats)
+        metrics['in_transit'] = len(self.inTransit)
+        metrics['sim_time'] = self.timeElapsed
+        metrics['intersections'] = {intersection.name: intersection.collectMetrics()
+                                    for intersection in self.intersections}
+        return metrics
+
+
+def grid(rows, cols, travelTime, **options):
+    """rows x cols junctions with two-way links between neighbours; options go to Intersection"""
+    cells = [[Intersection(name=f"r{r}c{c}", verbose=False, **options) for c in range(cols)] for r in range(rows)]
+    network = Network([intersection for row in cells for intersection in row])
+    for r in range(rows):
+        for c in range(cols):
+            for direction, (dr, dc) in directionSteps.items():
+                if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                    network.addLink(Link(cells[r][c], direction, cells[r + dr][c + dc], travelTime))
+    network.cells = cells
+    return network
+
+
+def corridor(length, travelTime, direction='right', **options):
+    """A single row (or column, for down/up) of junctions linked both ways"""
+    if direction in ('right', 'left'):
+        network = grid(1, length, travelTime, **options)
+        route = network.cells[0]
+    else:
+        network = grid(length, 1, travelTime, **options)
+        route = [row[0] for row in network.cells]
+    network.route = route if direction in ('right', 'down') else route[::-1]
+    return network
+
+
+def parse_grid(text):
+    rows, _, cols = text.lower().partition('x')
+    return int(rows), int(cols)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless simulation of a network of intersections")
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument("--grid", type=parse_grid, metavar="ROWSxCOLS", help="grid of junctions, e.g. 6x6")
+    layout.add_argument("--corridor", type=int, metavar="N", help="row of N junctions (default: 4)")
+    parser.add_argument("--travel-time", type=float, default=20.0,
+                        help="seconds between junctions (default: %(default)s)")
+    parser.add_argument("--green-wave", choices=list(directionNumbers.values()),
+                        help="offset signals for progression in this direction")
+    parser.add_argument("--detections", default="detected_vehicles.npz",
+                        help="detection file queued on every entry approach (default: %(default)s)")
+    parser.add_argument("--sim-time", type=int, default=300, help="simulated seconds (default: %(default)s)")
+    parser.add_argument("--timing", choices=list(strategies),
+                        help="green timing strategy for every junction (default: dynamic, static with --green-wave)")
+    parser.add_argument("--policy", choices=list(policies), help="phase selection policy for every junction")
+    args = parser.parse_args(argv)
+
+    if args.green_wave:
+        # Progression needs every junction to repeat the same fixed cycle
+        if args.timing not in (None, 'static') or args.policy not in (None, RoundRobin.name):
+            parser.error("--green-wave needs --timing static and the round-robin policy")
+        args.timing = 'static'
+    options = {'timing': args.timing or 'dynamic', 'policy': args.policy}
+    if args.grid:
+        network = grid(*args.grid, args.travel_time, **options)
+        if args.green_wave:
+            horizontal = args.green_wave in ('right', 'left')
+            lines = network.cells if horizontal else [list(column) for column in zip(*network.cells)]
+            for line in lines:
+                network.greenWave(line if args.green_wave in ('right', 'down') else line[::-1], args.green_wave)
+    else:
+        network = corridor(args.corridor or 4, args.travel_time, args.green_wave or 'right', **options)
+        if args.green_wave:
+            network.greenWave(network.route, args.green_wave)
+
+    if os.path.exists(args.detections):
+        network.seed(load_detection_file(args.detections))
+    else:
+        print(f"{args.detections} not found; the network starts empty")
+
+    metrics = network.runHeadless(args.sim_time)
+
+    print(f"\n--- NETWORK: {len(network.intersections)} junctions, {args.sim_time}s ---")
+    print(f"{'junction':10} {'offset':>7} {'crossed':>8} {'veh/s':>6} {'avg delay':>10} {'waiting':>8}")
+    for intersection in network.intersections:
+        row = metrics['intersections'][intersection.name]
+        print(f"{intersection.name:10} {network.offsets.get(intersection, 0.0):7.1f} {row['total_crossed']:8d} "
+              f"{row['vehicles_per_unit_time']:6.2f} {row['avg_delay']:9.1f}s {row['waiting_at_end']:8d}")
+    print(f"Entered: {metrics['entered']}, handed off: {metrics['handedOff']}, exited: {metrics['exited']}, "
+          f"in transit: {metrics['in_transit']}")
+    print(f"Wall-clock time: {metrics['wall_time']:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
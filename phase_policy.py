@@ -0,0 +1,92 @@
+"""
+Phase selection policies for SignalController.
+
+When a phase ends, the controller asks its policy which signal turns green
+next. choose(controller) receives the controller itself, so a policy can use
+controller.queues() (vehicles waiting per approach), controller.pressure()
+(queue minus downstream queue, if the controller has it), currentGreen,
+noOfSignals, clock and redSince (when each signal last turned red).
+"""
+
+
+class RoundRobin:
+    """The next signal in ring order, regardless of demand (the original plan)"""
+
+    name = 'round-robin'
+
+    def choose(self, controller):
+        return (controller.currentGreen + 1) % controller.noOfSignals
+
+
+class SkipEmpty:
+    """The next signal in ring order that has vehicles waiting; plain round robin if none do"""
+
+    name = 'skip-empty'
+
+    def choose(self, controller):
+        queues = controller.queues()
+        for step in range(1, controller.noOfSignals + 1):
+            candidate = (controller.currentGreen + step) % controller.noOfSignals
+            if queues[candidate] > 0:
+                return candidate
+        return (controller.currentGreen + 1) % controller.noOfSignals
+
+
+class MaxPressure:
+    """
+    The signal with the highest pressure: vehicles waiting on its approach
+    minus vehicles queued where they are heading. An isolated junction has no
+    downstream queues, so pressure is the queue length.
+
+    The signal that just ended is only chosen again when no other approach
+    has positive pressure, and ties go to the earliest signal in ring order.
+
+    Pressure alone can keep a light approach red forever, so a signal that
+    has been red for maxRed seconds with vehicles waiting is served first,
+    the one red longest before the others.
+    """
+
+    name = 'max-pressure'
+
+    def __init__(self, maxRed=120.0):
+        self.maxRed = maxRed
+
+    def choose(self, controller):
+        starved = self._starved(controller)
+        if starved is not None:
+            return starved
+        pressure = controller.pressure() if controller.pressure is not None else controller.queues()
+        current = controller.currentGreen
+        best, bestPressure = None, 0
+        for step in range(1, controller.noOfSignals):
+            candidate = (current + step) % controller.noOfSignals
+            if pressure[candidate] > bestPressure:
+                best, bestPressure = candidate, pressure[candidate]
+        if best is not None:
+            return best
+        if pressure[current] > 0:
+            return current
+        return (current + 1) % controller.noOfSignals
+
+    def _starved(self, controller):
+        """The waiting signal red for longest, if that is maxRed seconds or more"""
+        queues = controller.queues()
+        current = controller.currentGreen
+        starved, longestRed = None, self.maxRed
+        for step in range(1, controller.noOfSignals):
+            candidate = (current + step) % controller.noOfSignals
+            red = controller.clock - controller.redSince[candidate]
+            if queues[candidate] > 0 and red >= longestRed and (starved is None or red > longestRed):
+                starved, longestRed = candidate, red
+        return starved
+
+
+policies = {policy.name: policy for policy in (RoundRobin, SkipEmpty, MaxPressure)}
+
+
+def get_policy(name):
+    """Policy instance by name (see policies)"""
+    try:
+        return policies[name]()
+    except KeyError:
+        raise ValueError(f"unknown phase policy {name!r}; use one of {', '.join(policies)}") from None
@@ -0,0 +1,247 @@
+import collections
+import math
+import threading
+import time
+
+from phase_policy import RoundRobin, SkipEmpty
+
+# Remaining times below this are treated as elapsed (absorbs float drift from many small steps)
+EPSILON = 1e-6
+
+
+class TrafficSignal:
+    def __init__(self, red, yellow, green, minimum, maximum):
+        self.red = red
+        self.yellow = yellow
+        self.green = green
+        self.minimum = minimum
+        self.maximum = maximum
+        self.signalText = "30"
+        self.totalGreenTime = 0
+
+
+# Immutable view of the controller between two advance() calls; times holds (red, yellow, green) per signal
+SignalSnapshot = collections.namedtuple('SignalSnapshot', ['clock', 'currentGreen', 'currentYellow', 'times'])
+
+
+def displaySeconds(remaining):
+    """Whole seconds shown on a signal timer, matching the old one-second countdown"""
+    return max(0, math.ceil(remaining - EPSILON) - 1)
+
+
+class SignalController:
+    """
+    Phase state machine for a ring of traffic signals.
+
+    The current signal is green, then yellow, then hands green to the next
+    one. Signal times are float seconds and are counted down by advance(dt),
+    so phases resolve to any step size and any number of phase changes can
+    happen in one call. Nothing sleeps or recurses: a simulated clock calls
+    advance() directly, and run() drives it from the wall clock on a timer.
+
+    greenTime(i) gives the green duration when signal i turns green;
+    onGreen(i) and onYellow(i) are optional hooks for the simulation.
+
+    With actuated=True the green is not fixed when it starts. It begins at
+    minimumGreen, and every advance() extends it to at least gapTime while
+    demand()[currentGreen] reports vehicles near the stop line, up to
+    maximumGreen in total (max-out). It ends once no vehicle has been
+    detected for gapTime (gap-out). If no other approach is waiting, the
+    green rests on the current one instead of cycling through empty phases.
+
+    policy picks the signal that turns green when a phase ends (see
+    phase_policy.py). It defaults to round robin, or to skipping empty
+    approaches in actuated mode. pressure() is an optional per-signal
+    pressure for policies that use it.
+
+    The controller's own thread is the only writer of its state. Every
+    start() and advance() ends by committing a SignalSnapshot to
+    self.snapshot with a single assignment, so readers on other threads
+    take one consistent view without locking.
+
+    events is an optional event_log.EventLog that receives a green event
+    when a phase starts and a yellow event, with the green served and why
+    it ended, when it ends.
+    """
+
+    def __init__(self, signals, greenTime, defaultGreen, defaultYellow, defaultRed,
+                 onGreen=None, onYellow=None, actuated=False, demand=None, queues=None,
+                 minimumGreen=10, maximumGreen=60, gapTime=3.0, policy=None, pressure=None, metrics=None,
+                 events=None):
+        # A ring of zero-length phases would keep advance() changing phase without ever using up dt
+        for name, value in (('defaultGreen', defaultGreen), ('defaultYellow', defaultYellow),
+                            ('minimumGreen', minimumGreen), ('gapTime', gapTime)):
+            if value <= 0:
+                raise ValueError(f"{name} must be positive, got {value}")
+        self.signals = signals
+        self.greenTime = greenTime
+        self.defaultGreen = defaultGreen
+        self.defaultYellow = defaultYellow
+        self.defaultRed = defaultRed
+        self.onGreen = onGreen
+        self.onYellow = onYellow
+        self.currentGreen = 0
+        self.nextGreen = 1
+        self.currentYellow = 0
+        self.clock = 0.0
+        self.actuated = actuated
+        self.demand = demand
+        self.queues = queues
+        self.minimumGreen = minimumGreen
+        self.maximumGreen = maximumGreen
+        self.gapTime = gapTime
+        self.policy = policy or (SkipEmpty() if actuated else RoundRobin())
+        self.pressure = pressure
+        # Optional metrics.MetricsRegistry; run() records tick cost and jitter into it
+        self.metrics = metrics
+        self.events = events
+        # Green served so far in the current phase (actuated mode caps it at maximumGreen)
+        self.greenElapsed = 0.0
+        # Clock time each signal last turned red (its yellow ended), or when the controller started
+        self.redSince = [0.0] * len(signals)
+        self.phaseChanges = {'gapOut': 0, 'maxOut': 0, 'skipped': 0}
+        self.commit()
+
+    @property
+    def noOfSignals(self):
+        return len(self.signals)
+
+    def start(self, first=None):
+        """Begin the first green phase, on signal first if given (else the current one, normally 0)"""
+        if first is not None:
+            self.currentGreen = first
+        self.redSince = [self.clock] * self.noOfSignals
+        self.nextGreen = (self.currentGreen + 1) % self.noOfSignals
+        self._startGreen()
+        self.commit()
+
+    def commit(self):
+        """Publish the current phase and signal times as self.snapshot"""
+        self.snapshot = SignalSnapshot(self.clock, self.currentGreen, self.currentYellow,
+                                       tuple((signal.red, signal.yellow, signal.green) for signal in self.signals))
+
+    def _startGreen(self):
+        if self.onGreen is not None:
+            self.onGreen(self.currentGreen)
+        self.greenElapsed = 0.0
+        if self.actuated:
+            self.signals[self.currentGreen].green = self.minimumGreen
+        else:
+            self.signals[self.currentGreen].green = self.greenTime(self.currentGreen)
+        if self.events is not None:
+            self.events.emit('green', self.clock, self.currentGreen, value=self.signals[self.currentGreen].green)
+
+    def _startYellow(self, reason=0):
+        """reason is 0 for a timed green, 1 for a gap-out and 2 for a max-out (event log codes)"""
+        self.currentYellow = 1
+        if self.events is not None:
+            self.events.emit('yellow', self.clock, self.currentGreen, value=self.greenElapsed, code=reason)
+        if self.onYellow is not None:
+            self.onYellow(self.currentGreen)
+
+    def _endPhase(self):
+        """Reset the finished signal and hand green over to the next one"""
+        signal = self.signals[self.currentGreen]
+        self.currentYellow = 0
+        signal.green = self.defaultGreen
+        signal.yellow = self.defaultYellow
+        signal.red = self.defaultRed
+
+        previous = self.currentGreen
+        self.redSince[previous] = self.clock
+        self.currentGreen = self.policy.choose(self)
+        self.phaseChanges['skipped'] += self._emptySkipped(previous)
+        # Only a display estimate when the policy is demand-driven
+        self.nextGreen = (self.currentGreen + 1) % self.noOfSignals
+        current = self.signals[self.currentGreen]
+        self.signals[self.nextGreen].red = current.yellow + current.green
+
+    def _emptySkipped(self, previous):
+        """Signals with nobody waiting that were passed over in ring order going from previous to currentGreen"""
+        if self.currentGreen == previous or self.queues is None:
+            return 0
+        queues = self.queues()
+        passed = range(1, (self.currentGreen - previous) % self.noOfSignals)
+        return sum(1 for step in passed if queues[(previous + step) % self.noOfSignals] == 0)
+
+    def _othersWaiting(self):
+        queues = self.queues()
+        return any(queues[i] > 0 for i in range(self.noOfSignals) if i != self.currentGreen)
+
+    def _actuate(self):
+        """Extend the current green while vehicles are detected near the stop line"""
+        signal = self.signals[self.currentGreen]
+        remainingToMax = self.maximumGreen - self.greenElapsed
+        if self.demand()[self.currentGreen] > 0:
+            signal.green = min(max(signal.green, self.gapTime), remainingToMax)
+
+    def timeToNextChange(self):
+        signal = self.signals[self.currentGreen]
+        return max(0.0, signal.yellow if self.currentYellow else signal.green)
+
+    def advance(self, dt):
+        """Move the signals forward by dt seconds, changing phase as often as needed"""
+        if self.actuated and self.currentYellow == 0:
+            self._actuate()
+        while True:
+            remaining = self.timeToNextChange()
+            if remaining <= EPSILON:
+                if self.currentYellow == 0:
+                    if self.actuated and not self._othersWaiting():
+                        # Rest in green: nothing else to serve, so check again after gapTime
+                        self.signals[self.currentGreen].green = self.gapTime
+                        self.greenElapsed = 0.0
+                        continue
+                    reason = 0
+                    if self.actuated:
+                        maxedOut = self.greenElapsed >= self.maximumGreen - EPSILON
+                        self.phaseChanges['maxOut' if maxedOut else 'gapOut'] += 1
+                        reason = 2 if maxedOut else 1
+                    self._startYellow(reason)
+                else:
+                    self._endPhase()
+                    self._startGreen()
+                continue
+            if dt <= 0:
+                self.commit()
+                return
+            step = min(dt, remaining)
+            self._countDown(step)
+            self.clock += step
+            dt -= step
+
+    def _countDown(self, step):
+        for i, signal in enumerate(self.signals):
+            if i == self.currentGreen:
+                if self.currentYellow == 0:
+                    signal.green -= step
+                    signal.totalGreenTime += step
+                    self.greenElapsed += step
+                else:
+                    signal.yellow -= step
+            else:
+                signal.red -= step
+
+    def run(self, stopEvent=None, resolution=0.1):
+        """
+        Drive the controller from the wall clock until stopEvent is set.
+
+        Waits on the event until the next phase change or `resolution`
+        seconds, whichever is sooner, then advances by the measured time.
+        """
+        stopEvent = stopEvent or threading.Event()
+        if self.metrics is not None:
+            tickTime = self.metrics.summary('controller_tick_seconds', 'Time spent in one controller advance()')
+            jitter = self.metrics.summary('controller_tick_jitter_seconds',
+                                          'How much later than requested the controller woke up')
+        last = time.monotonic()
+        while True:
+            requested = min(resolution, self.timeToNextChange())
+            if stopEvent.wait(requested):
+                return
+            now = time.monotonic()
+            self.advance(now - last)
+            if self.metrics is not None:
+                jitter.observe(now - last - requested)
+                tickTime.observe(time.monotonic() - now)
+            last = now
@@ -2,18 +2,23 @@ import random
 import math
 import time
 import threading
+import argparse
 import pygame
 import sys
 import os
-import json
+import copy
+import collections
 import numpy as np
 
-# Load YOLO model
-try:
-    from ultralytics import YOLO
-    model = YOLO('best.pt')
-except:
-    print("Warning: YOLO model not found")
+from vehicle_state import VehicleState
+from sprite_cache import TextCache, spriteCache
+from detection_io import DetectionSet, DetectionStreamReader, load_detection_file
+from signal_controller import SignalController, TrafficSignal, displaySeconds
+from phase_policy import get_policy, policies
+from timing_strategy import get_strategy, strategies
+from traffic_generator import TrafficGenerator, parse_profile, parse_rates
+from metrics import MetricsRegistry
+from event_log import EventLog, LEVELS
 
 # Default signal times
 defaultRed = 150
@@ -31,14 +36,17 @@ vehicle_timings = {
     'bike': 1.0
 }
 
-signals = []
 noOfSignals = 4
 simTime = 500
-timeElapsed = 0
+framesPerSecond = 30
 
-currentGreen = 0
-nextGreen = (currentGreen+1) % noOfSignals
-currentYellow = 0
+# Lanes sharing a direction's green time (divisor in calculate_dynamic_green_time)
+noOfLanes = 3
+
+# Actuated control: green is extended while a vehicle is within detectionZone pixels
+# of the stop line, and ends after gapTime seconds without one
+gapTime = 3.0
+detectionZone = 200
 
 # Vehicle timing
 carTime = 2
@@ -49,16 +57,17 @@ truckTime = 2.5
 
 speeds = {'car': 2.25, 'bus': 1.8, 'truck': 1.8, 'van': 2, 'bike': 2.5}
 
+# Initial spawn coordinates and queue stops; every Intersection works on its own copy
 x = {'right': [0, 0, 0], 'down': [755, 727, 697], 'left': [1400, 1400, 1400], 'up': [602, 627, 657]}
 y = {'right': [348, 370, 398], 'down': [0, 0, 0], 'left': [498, 466, 436], 'up': [800, 800, 800]}
 
-vehicles = {'right': {0: [], 1: [], 2: [], 'crossed': 0},
-            'down': {0: [], 1: [], 2: [], 'crossed': 0},
-            'left': {0: [], 1: [], 2: [], 'crossed': 0},
-            'up': {0: [], 1: [], 2: [], 'crossed': 0}}
-
 vehicleTypes = {0: 'car', 1: 'bus', 2: 'truck', 3: 'van', 4: 'bike'}
 directionNumbers = {0: 'right', 1: 'down', 2: 'left', 3: 'up'}
+directionIndex = {direction: i for i, direction in directionNumbers.items()}
+
+# Column of each vehicle_timings class in VehicleState.waiting
+timingClasses = list(vehicle_timings.keys())
+timingClassIds = {vtype: i for i, vtype in enumerate(timingClasses)}
 
 signalCoods = [(530, 230), (810, 230), (810, 570), (530, 570)]
 signalTimerCoods = [(530, 210), (810, 210), (810, 550), (530, 550)]
@@ -68,160 +77,136 @@ stopLines = {'right': 590, 'down': 330, 'left': 800, 'up': 535}
 defaultStop = {'right': 580, 'down': 320, 'left': 810, 'up': 545}
 stops = {'right': [580, 580, 580], 'down': [320, 320, 320], 'left': [810, 810, 810], 'up': [545, 545, 545]}
 
+# Crossed vehicles are retired once their rear edge passes these lines (the edge of the 1400x800 window)
+exitLines = {'right': 1400, 'down': 800, 'left': 0, 'up': 0}
+
 mid = {'right': {'x': 705, 'y': 445}, 'down': {'x': 695, 'y': 450},
        'left': {'x': 695, 'y': 425}, 'up': {'x': 695, 'y': 400}}
 
 rotationAngle = 3
+
+black = (0, 0, 0)
+white = (255, 255, 255)
 gap = 15
 gap2 = 15
 
 pygame.init()
-simulation = pygame.sprite.Group()
-
-# Global variables for detected vehicles
-detected_vehicles_from_file = {}
-vehicles_created = False
 
-
-class TrafficSignal:
-    def __init__(self, red, yellow, green, minimum, maximum):
-        self.red = red
-        self.yellow = yellow
-        self.green = green
-        self.minimum = minimum
-        self.maximum = maximum
-        self.signalText = "30"
-        self.totalGreenTime = 0
+# Detection sources
+detectionFiles = ["detected_vehicles.npz", "detected_vehicles.json"]
+# Live detections appended by app.py while the simulation runs (enabled with --follow)
+detectionStreamFile = "detected_vehicles.stream"
 
 
 class Vehicle(pygame.sprite.Sprite):
-    def __init__(self, lane, vehicleClass, direction_number, direction, will_turn, is_detected=False):
+    def __init__(self, intersection, lane, vehicleClass, direction_number, direction, will_turn, is_detected=False):
         pygame.sprite.Sprite.__init__(self)
+        self.intersection = intersection
+        self.state = intersection.vehicleState
+        self.spawn(lane, vehicleClass, direction_number, direction, will_turn, is_detected)
+
+    def spawn(self, lane, vehicleClass, direction_number, direction, will_turn, is_detected=False):
+        """(Re)initialize this sprite as a new vehicle queued at the back of its lane"""
+        intersection = self.intersection
         self.lane = lane
         self.vehicleClass = vehicleClass
-        self.speed = speeds.get(vehicleClass, 2)
+        # Normalized once here; green time calculation works on per-class counters
+        self.vehicleType = normalize_vehicle_type(vehicleClass)
         self.direction_number = direction_number
         self.direction = direction
-        self.x = x[direction][lane]
-        self.y = y[direction][lane]
-        self.crossed = 0
+        stops = intersection.stops
+        queue = intersection.vehicles[direction][lane]
         self.willTurn = will_turn
         self.turned = 0
         self.rotateAngle = 0
         self.is_detected = is_detected
         
-        vehicles[direction][lane].append(self)
-        self.index = len(vehicles[direction][lane]) - 1
+        # Vehicles still on screen in this lane, oldest first; retired vehicles are removed
+        predecessor = queue[-1] if queue else None
+        queue.append(self)
         
-        # Map similar vehicle types for fallback
-        vehicle_fallbacks = {
-            'motorbike': 'bike',
-            'bicycle': 'bike',
-            'van': 'car'
-        }
-        
-        # Load vehicle image from vehicles folder
-        # Try different extensions for the vehicle class and its fallback
-        image_loaded = False
-        vehicle_to_load = vehicleClass
-        
-        # Try original vehicle class first, then fallback
-        for attempt in [vehicleClass, vehicle_fallbacks.get(vehicleClass)]:
-            if attempt is None:
-                continue
-            for ext in ['.png', '.jpg', '.jpeg']:
-                path = f"images/vehicles/{attempt}{ext}"
-                if os.path.exists(path):
-                    try:
-                        self.originalImage = pygame.image.load(path)
-                        self.currentImage = pygame.image.load(path)
-                        image_loaded = True
-                        break
-                    except:
-                        continue
-            if image_loaded:
-                break
-        
-        # Fallback to colored rectangle if image not found
-        if not image_loaded:
-            self.originalImage = pygame.Surface((50, 30))
-            self.originalImage.fill((100, 100, 100))
-            self.currentImage = self.originalImage.copy()
-        
-        # Rotate image based on direction
-        # Assuming original images face UP, rotate accordingly
-        rotation_angles = {
-            'right': -90,  # Rotate 90 degrees clockwise
-            'down': 180,   # Rotate 180 degrees
-            'left': 90,    # Rotate 90 degrees counter-clockwise
-            'up': 0        # No rotation needed
-        }
+        # Shared, pre-rotated surface for this class and direction
+        self.originalImage = spriteCache.get(vehicleClass, direction)
+        self.currentImage = self.originalImage
         
-        if direction in rotation_angles and rotation_angles[direction] != 0:
-            self.originalImage = pygame.transform.rotate(self.originalImage, rotation_angles[direction])
-            self.currentImage = pygame.transform.rotate(self.currentImage, rotation_angles[direction])
+        # Spawn behind the predecessor, but never further back than the lane's spawn point
+        spawnX = intersection.x[direction][lane]
+        spawnY = intersection.y[direction][lane]
+        if predecessor is not None:
+            predRect = predecessor.currentImage.get_rect()
+            if direction == 'right':
+                spawnX = min(spawnX, predecessor.x - predRect.width - gap)
+            elif direction == 'left':
+                spawnX = max(spawnX, predecessor.x + predRect.width + gap)
+            elif direction == 'down':
+                spawnY = min(spawnY, predecessor.y - predRect.height - gap)
+            elif direction == 'up':
+                spawnY = max(spawnY, predecessor.y + predRect.height + gap)
         
         # Calculate stop position
         if direction == 'right':
-            if len(vehicles[direction][lane]) > 1 and vehicles[direction][lane][self.index-1].crossed == 0:
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().width - gap
+            if predecessor is not None and predecessor.crossed == 0:
+                stop = predecessor.stop - predecessor.currentImage.get_rect().width - gap
             else:
-                self.stop = defaultStop[direction]
+                stop = defaultStop[direction]
             temp = self.currentImage.get_rect().width + gap
-            x[direction][lane] -= temp
             stops[direction][lane] -= temp
         elif direction == 'left':
-            if len(vehicles[direction][lane]) > 1 and vehicles[direction][lane][self.index-1].crossed == 0:
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().width + gap
+            if predecessor is not None and predecessor.crossed == 0:
+                stop = predecessor.stop + predecessor.currentImage.get_rect().width + gap
             else:
-                self.stop = defaultStop[direction]
+                stop = defaultStop[direction]
             temp = self.currentImage.get_rect().width + gap
-            x[direction][lane] += temp
             stops[direction][lane] += temp
         elif direction == 'down':
-            if len(vehicles[direction][lane]) > 1 and vehicles[direction][lane][self.index-1].crossed == 0:
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().height - gap
+            if predecessor is not None and predecessor.crossed == 0:
+                stop = predecessor.stop - predecessor.currentImage.get_rect().height - gap
             else:
-                self.stop = defaultStop[direction]
+                stop = defaultStop[direction]
             temp = self.currentImage.get_rect().height + gap
-            y[direction][lane] -= temp
             stops[direction][lane] -= temp
         elif direction == 'up':
-            if len(vehicles[direction][lane]) > 1 and vehicles[direction][lane][self.index-1].crossed == 0:
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().height + gap
+            if predecessor is not None and predecessor.crossed == 0:
+                stop = predecessor.stop + predecessor.currentImage.get_rect().height + gap
             else:
-                self.stop = defaultStop[direction]
+                stop = defaultStop[direction]
             temp = self.currentImage.get_rect().height + gap
-            y[direction][lane] += temp
             stops[direction][lane] += temp
         
-        simulation.add(self)
-
-    def move(self):
-        if self.direction == 'right':
-            if self.crossed == 0 and self.x + self.currentImage.get_rect().width > stopLines[self.direction]:
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if ((self.x + self.currentImage.get_rect().width <= self.stop or self.crossed == 1 or (currentGreen == 0 and currentYellow == 0)) and (self.index == 0 or self.x + self.currentImage.get_rect().width < (vehicles[self.direction][self.lane][self.index-1].x - gap2))):
-                self.x += self.speed
-        elif self.direction == 'down':
-            if self.crossed == 0 and self.y + self.currentImage.get_rect().height > stopLines[self.direction]:
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if ((self.y + self.currentImage.get_rect().height <= self.stop or self.crossed == 1 or (currentGreen == 1 and currentYellow == 0)) and (self.index == 0 or self.y + self.currentImage.get_rect().height < (vehicles[self.direction][self.lane][self.index-1].y - gap2))):
-                self.y += self.speed
-        elif self.direction == 'left':
-            if self.crossed == 0 and self.x < stopLines[self.direction]:
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if ((self.x >= self.stop or self.crossed == 1 or (currentGreen == 2 and currentYellow == 0)) and (self.index == 0 or self.x > (vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2))):
-                self.x -= self.speed
-        elif self.direction == 'up':
-            if self.crossed == 0 and self.y < stopLines[self.direction]:
-                self.crossed = 1
-                vehicles[self.direction]['crossed'] += 1
-            if ((self.y >= self.stop or self.crossed == 1 or (currentGreen == 3 and currentYellow == 0)) and (self.index == 0 or self.y > (vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height + gap2))):
-                self.y -= self.speed
+        rect = self.currentImage.get_rect()
+        leader = predecessor.slot if predecessor is not None else -1
+        self.slot = self.state.add(spawnX, spawnY, speeds.get(vehicleClass, 2), rect.width, rect.height,
+                                   stop, direction_number, lane, timingClassIds[self.vehicleType], leader,
+                                   now=intersection.controller.clock, image=self.currentImage)
+        
+        intersection.sprites.add(self)
+
+    # Sprites are a view over the intersection's VehicleState; movement happens in moveVehicles()
+    @property
+    def x(self):
+        return self.state.x[self.slot]
+
+    @property
+    def y(self):
+        return self.state.y[self.slot]
+
+    @property
+    def speed(self):
+        return self.state.speed[self.slot]
+
+    @property
+    def stop(self):
+        return self.state.stop[self.slot]
+
+    @property
+    def crossed(self):
+        return int(self.state.crossed[self.slot])
+
+
+# One step's view of an Intersection for the window: signal_controller.SignalSnapshot, crossed counts
+# per direction, and the image and current / previous-step position of every vehicle by VehicleState slot
+FrameSnapshot = collections.namedtuple('FrameSnapshot', ['step', 'timeElapsed', 'signals', 'crossed', 'slots',
+                                                         'images', 'x', 'y', 'prevX', 'prevY'])
 
 
 def normalize_vehicle_type(vehicle_class):
@@ -241,259 +226,762 @@ def normalize_vehicle_type(vehicle_class):
         return 'car'  # Default to car
 
 
-def calculate_dynamic_green_time(direction):
-    """
-    Calculate green signal time based on vehicle density using the formula:
-    GST = Σ(NoOfVehicles_VC × AverageTime_VC) / NoOfLanes
-    
-    Where:
-    - VC = Vehicle Class
-    - NoOfVehicles_VC = Total count of vehicles from each class
-    - AverageTime_VC = Time each vehicle type takes to pass intersection
-    - NoOfLanes = Number of lanes (3 in this case)
+class Intersection:
     """
-    
-    # Count vehicles by type in the direction (only non-crossed vehicles)
-    vehicle_count_by_type = {vtype: 0 for vtype in vehicle_timings.keys()}
-    
-    for lane in range(3):
-        for vehicle in vehicles[direction][lane]:
-            if vehicle.crossed == 0:  # Only count waiting vehicles
-                normalized_type = normalize_vehicle_type(vehicle.vehicleClass)
-                vehicle_count_by_type[normalized_type] += 1
-    
-    # Calculate total time needed
-    total_time = 0
-    for vtype, count in vehicle_count_by_type.items():
-        total_time += count * vehicle_timings[vtype]
-    
-    # Divide by number of lanes
-    no_of_lanes = 3
-    green_time = total_time / no_of_lanes if total_time > 0 else defaultMinimum
-    
-    # Apply min/max limits
-    green_time = max(defaultMinimum, min(green_time, defaultMaximum))
-    
-    return int(green_time)
-
-
-def load_detected_vehicles():
-    """Load vehicles from detected_vehicles.json"""
-    global detected_vehicles_from_file, vehicles_created
-    
-    if os.path.exists("detected_vehicles.json"):
-        try:
-            with open("detected_vehicles.json", "r") as f:
-                detected_vehicles_from_file = json.load(f)
-            print("✓ Loaded detected vehicles from app.py")
-            return True
-        except Exception as e:
-            print(f"Error loading detections: {e}")
-    return False
-
-
-def create_vehicles_from_detections():
-    """Create vehicles in simulation based on detections"""
-    global vehicles_created
-    
-    if not detected_vehicles_from_file or vehicles_created:
-        return
-    
-    for direction, detections in detected_vehicles_from_file.items():
-        for idx, detection in enumerate(detections):
-            vehicle_type = detection.get('class', 'car')
-            lane = idx % 2 + 1  # Distribute across lanes
-            direction_num = list(directionNumbers.keys())[list(directionNumbers.values()).index(direction)]
-            
-            vehicle = Vehicle(lane, vehicle_type, direction_num, direction, will_turn=0, is_detected=True)
-            print(f"Created: {vehicle_type} in {direction} lane {lane}")
-    
-    vehicles_created = True
+    One four-way junction and everything that used to be module state:
+    signals and their controller, vehicle queues, spawn coordinates, stop
+    positions, the vehicle state arrays, sprites and the elapsed time.
 
+    Intersections share nothing but the read-only sprite cache, so any number
+    of them can run side by side in one process. Timing parameters default to
+    the module-level values at construction time.
+    """
 
-def initialize():
-    ts1 = TrafficSignal(0, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
-    signals.append(ts1)
-    ts2 = TrafficSignal(ts1.red + ts1.yellow + ts1.green, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
-    signals.append(ts2)
-    ts3 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
-    signals.append(ts3)
-    ts4 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
-    signals.append(ts4)
-    repeat()
+    def __init__(self, name="intersection", defaultRed=None, defaultYellow=None, defaultGreen=None,
+                 defaultMinimum=None, defaultMaximum=None, vehicleTimings=None, noOfLanes=None,
+                 detectionFiles=None, verbose=True, timing='dynamic', policy=None, metrics=None,
+                 events=None):
+        module = sys.modules[__name__]
+        self.name = name
+        self.defaultRed = module.defaultRed if defaultRed is None else defaultRed
+        self.defaultYellow = module.defaultYellow if defaultYellow is None else defaultYellow
+        self.defaultGreen = module.defaultGreen if defaultGreen is None else defaultGreen
+        self.defaultMinimum = module.defaultMinimum if defaultMinimum is None else defaultMinimum
+        self.defaultMaximum = module.defaultMaximum if defaultMaximum is None else defaultMaximum
+        self.vehicle_timings = dict(module.vehicle_timings if vehicleTimings is None else vehicleTimings)
+        self.noOfLanes = module.noOfLanes if noOfLanes is None else noOfLanes
+        self.detectionFiles = list(module.detectionFiles if detectionFiles is None else detectionFiles)
+        self.verbose = verbose
+        # How long greens last (see timing_strategy.py); a name or a strategy instance
+        self.timing = get_strategy(timing) if isinstance(timing, str) else timing
+        self.actuated = self.timing.actuated
+        # Optional metrics.MetricsRegistry for step timings and per-approach time series
+        self.metrics = metrics
+        # Optional event_log.EventLog of phase changes, spawns and crossings; replaces the console output
+        self.events = events
+        self.stepTime = metrics.summary('step_seconds', 'Wall time of one simulation step') if metrics else None
+        # Fixed steps taken so far; every framesPerSecond of them is one simulated second
+        self.frameCount = 0
+        self.lastCrossed = {direction: 0 for direction in directionNumbers.values()}
+        # Vehicles queued downstream of each approach; set by network.Network, None when isolated
+        self.downstreamQueues = None
+        
+        self.signals = []
+        self.timeElapsed = 0
+        self.x = copy.deepcopy(x)
+        self.y = copy.deepcopy(y)
+        self.stops = copy.deepcopy(stops)
+        self.vehicles = {direction: {0: [], 1: [], 2: [], 'crossed': 0} for direction in directionNumbers.values()}
+        self.sprites = pygame.sprite.Group()
+        self.vehicleState = VehicleState(directionNumbers, stopLines, gap2, noOfClasses=len(timingClasses),
+                                         exitLines=exitLines)
+        # Vehicle sprite per VehicleState slot, and retired sprites waiting to be reused
+        self.vehicleBySlot = {}
+        self.vehiclePool = []
+        
+        # Detected vehicles
+        self.detected_vehicles_from_file = None
+        self.vehicles_created = False
+        # Vehicles spawned per direction so far; alternates new vehicles between lanes 1 and 2
+        self.detectionSpawnIndex = {direction: 0 for direction in directionNumbers.values()}
+        self.detectionStream = None
+        # Synthetic arrivals (traffic_generator.TrafficGenerator), polled every frame
+        self.generator = None
+        self.ingestStats = {'batches': 0, 'vehicles': 0, 'totalLatency': 0.0, 'maxLatency': 0.0}
+        
+        self.createSignals()
+        self.controller = SignalController(self.signals,
+                                           lambda i: self.timing.greenTime(self, directionNumbers[i]),
+                                           self.defaultGreen, self.defaultYellow, self.defaultRed,
+                                           onGreen=self.onGreen, onYellow=self.onYellow,
+                                           actuated=self.actuated,
+                                           demand=lambda: self.vehicleState.approachDemand(detectionZone),
+                                           queues=lambda: self.vehicleState.waiting.sum(axis=1),
+                                           minimumGreen=self.defaultMinimum, maximumGreen=self.defaultMaximum,
+                                           gapTime=gapTime,
+                                           policy=get_policy(policy) if isinstance(policy, str) else policy,
+                                           pressure=self.pressure, metrics=metrics, events=events)
+
+    def createSignals(self):
+        defaultRed, defaultYellow, defaultGreen = self.defaultRed, self.defaultYellow, self.defaultGreen
+        defaultMinimum, defaultMaximum = self.defaultMinimum, self.defaultMaximum
+        ts1 = TrafficSignal(0, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
+        self.signals.append(ts1)
+        ts2 = TrafficSignal(ts1.red + ts1.yellow + ts1.green, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
+        self.signals.append(ts2)
+        ts3 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
+        self.signals.append(ts3)
+        ts4 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
+        self.signals.append(ts4)
+
+    def onGreen(self, signalIndex):
+        self.timing.onGreen(self, directionNumbers[signalIndex])
+
+    def onYellow(self, signalIndex):
+        """Release the queue stop positions of the direction that just lost green"""
+        direction = directionNumbers[signalIndex]
+        for i in range(0, 3):
+            self.stops[direction][i] = defaultStop[direction]
+
+    def pressure(self):
+        """Waiting vehicles per approach minus those queued where they are heading"""
+        queues = self.vehicleState.waiting.sum(axis=1)
+        if self.downstreamQueues is None:
+            return queues
+        return queues - self.downstreamQueues()
+
+    def moveVehicles(self, hold=False):
+        """
+        Move every vehicle one frame with a single vectorized step and return
+        the VehicleState slots that crossed the stop line. hold=True keeps
+        every approach on red (a junction whose signals have not started yet).
+        """
+        controller = self.controller
+        currentGreen = -1 if hold else controller.currentGreen
+        crossedCounts = self.vehicleState.step(currentGreen, controller.currentYellow, now=controller.clock)
+        for i in np.flatnonzero(crossedCounts):
+            self.vehicles[directionNumbers[i]]['crossed'] += int(crossedCounts[i])
+        if self.events is not None and len(self.vehicleState.crossedSlots) and self.events.logs('cross'):
+            self.logCrossings(self.vehicleState.crossedSlots)
+        for slot in self.vehicleState.exitedSlots:
+            self.retireVehicle(self.vehicleBySlot[slot])
+        return self.vehicleState.crossedSlots
+
+    def logCrossings(self, slots):
+        """Emit a cross event, with the vehicle's delay since spawning, for each slot"""
+        state = self.vehicleState
+        for slot in slots.tolist():
+            self.events.emit('cross', state.crossTime[slot], int(state.direction[slot]), int(state.lane[slot]),
+                             int(state.vehicleClass[slot]), slot, state.crossTime[slot] - state.spawnTime[slot])
+
+    def step(self, dt):
+        """Advance the junction by one frame of dt simulated seconds"""
+        crossedSlots = self.moveVehicles()
+        self.controller.advance(dt)
+        return crossedSlots
+
+    def simulateFrame(self):
+        """
+        Spawn generated arrivals and advance by one fixed step of
+        1/framesPerSecond simulated seconds. Every framesPerSecond steps the
+        elapsed time goes up by a second and metrics are sampled; returns
+        True on those steps.
+        """
+        start = time.perf_counter()
+        self.generateTraffic()
+        self.step(1.0 / framesPerSecond)
+        if self.stepTime is not None:
+            self.stepTime.observe(time.perf_counter() - start)
+        self.frameCount += 1
+        if self.frameCount % framesPerSecond:
+            return False
+        self.timeElapsed += 1
+        if self.metrics is not None:
+            self.sampleMetrics()
+        return True
+
+    def snapshot(self):
+        """Everything the window draws, copied between two steps (see FrameSnapshot)"""
+        state = self.vehicleState
+        slots = np.flatnonzero(state.active[:state.count])
+        return FrameSnapshot(self.frameCount, self.timeElapsed, self.controller.snapshot,
+                             tuple(self.vehicles[directionNumbers[i]]['crossed'] for i in range(noOfSignals)),
+                             slots, state.image[slots], state.x[slots], state.y[slots],
+                             state.prevX[slots], state.prevY[slots])
+
+    def sampleMetrics(self):
+        """Record one row of per-approach queue length, mean wait and throughput since the last sample"""
+        queue, wait = self.vehicleState.approachStats(self.controller.clock)
+        row = {'t': self.timeElapsed}
+        for i, direction in directionNumbers.items():
+            crossed = self.vehicles[direction]['crossed']
+            row[f'queue_{direction}'] = int(queue[i])
+            row[f'wait_{direction}'] = round(float(wait[i]), 3)
+            row[f'crossed_{direction}'] = crossed - self.lastCrossed[direction]
+            self.lastCrossed[direction] = crossed
+        self.metrics.record('approach', row)
+        self.metrics.set('vehicles_on_screen', len(self.vehicleBySlot), 'Vehicles currently simulated')
+        self.metrics.set('time_elapsed_seconds', self.timeElapsed, 'Simulated seconds elapsed')
+
+    def calculate_dynamic_green_time(self, direction):
+        """
+        Calculate green signal time based on vehicle density using the formula:
+        GST = Σ(NoOfVehicles_VC × AverageTime_VC) / NoOfLanes
+        
+        Where:
+        - VC = Vehicle Class
+        - NoOfVehicles_VC = Total count of vehicles from each class
+        - AverageTime_VC = Time each vehicle type takes to pass intersection
+        - NoOfLanes = Number of lanes (3 in this case)
+        """
+        
+        # Waiting (non-crossed) vehicles by type, kept up to date by vehicleState
+        vehicle_count_by_type = self.vehicleState.waiting[directionIndex[direction]]
+        
+        # Calculate total time needed
+        total_time = 0
+        for i, vtype in enumerate(timingClasses):
+            total_time += int(vehicle_count_by_type[i]) * self.vehicle_timings[vtype]
+        
+        # Divide by number of lanes
+        green_time = total_time / self.noOfLanes if total_time > 0 else self.defaultMinimum
+        
+        # Apply min/max limits
+        green_time = max(self.defaultMinimum, min(green_time, self.defaultMaximum))
+        
+        return int(green_time)
+
+    def load_detected_vehicles(self):
+        """Load vehicles from detected_vehicles.npz, or detected_vehicles.json if there is no binary file"""
+        for path in self.detectionFiles:
+            if os.path.exists(path):
+                try:
+                    self.detected_vehicles_from_file = load_detection_file(path)
+                    print(f"✓ Loaded detected vehicles from app.py ({path})")
+                    return True
+                except Exception as e:
+                    print(f"Error loading detections: {e}")
+        return False
+
+    def detect_vehicles_from_images(self, image_dir, weights="best.pt"):
+        """Run YOLO on image_dir/<direction>/* instead of reading detected_vehicles.json"""
+        # Imported here so ultralytics/torch are only loaded when detection is requested
+        from model_provider import get_provider
+        from detection import detect_lane_images
+        
+        self.detected_vehicles_from_file = DetectionSet.from_dict(
+            detect_lane_images(image_dir, get_provider(weights), directions=list(directionNumbers.values())))
+        print(f"✓ Detected {len(self.detected_vehicles_from_file)} vehicles in {image_dir}")
+
+    def loadDetections(self, image_dir=None):
+        """Use fresh detections from image_dir when given, else the detection files"""
+        if image_dir:
+            self.detect_vehicles_from_images(image_dir)
+        else:
+            self.load_detected_vehicles()
+
+    def spawnVehicle(self, vehicleClass, direction, is_detected=True):
+        """Queue one vehicle at the back of an approach, continuing the direction's lane rotation"""
+        idx = self.detectionSpawnIndex[direction]
+        self.detectionSpawnIndex[direction] += 1
+        lane = idx % 2 + 1  # Distribute across lanes
+        if self.vehiclePool:
+            vehicle = self.vehiclePool.pop()
+            vehicle.spawn(lane, vehicleClass, directionIndex[direction], direction, will_turn=0,
+                          is_detected=is_detected)
+        else:
+            vehicle = Vehicle(self, lane, vehicleClass, directionIndex[direction], direction, will_turn=0,
+                              is_detected=is_detected)
+        self.vehicleBySlot[vehicle.slot] = vehicle
+        if self.events is not None and self.events.logs('spawn'):
+            self.events.emit('spawn', self.controller.clock, directionIndex[direction], lane,
+                             timingClassIds[vehicle.vehicleType], vehicle.slot, code=0 if is_detected else 1)
+        return vehicle
+
+    def retireVehicle(self, vehicle):
+        """Take a vehicle that has left the screen out of its lane and free its slot for reuse"""
+        self.vehicles[vehicle.direction][vehicle.lane].remove(vehicle)
+        self.sprites.remove(vehicle)
+        del self.vehicleBySlot[vehicle.slot]
+        self.vehicleState.remove(vehicle.slot)
+        self.vehiclePool.append(vehicle)
+
+    def spawnDetections(self, detections):
+        """Create one vehicle per detected box, continuing each direction's lane rotation"""
+        for direction in detections.directions:
+            for vehicle_type in detections.classes(direction):
+                vehicle = self.spawnVehicle(vehicle_type, direction)
+                if self.verbose and self.events is None:
+                    print(f"Created: {vehicle_type} in {direction} lane {vehicle.lane}")
+
+    def create_vehicles_from_detections(self):
+        """Create vehicles in simulation based on detections"""
+        if not self.detected_vehicles_from_file or self.vehicles_created:
+            return
+        
+        # Let go of the memory-mapped .npz once spawned; Windows won't let app.py replace or remove a mapped file
+        detections, self.detected_vehicles_from_file = self.detected_vehicles_from_file, None
+        self.spawnDetections(detections)
+        self.vehicles_created = True
+
+    def follow(self, path=None):
+        """Spawn vehicles from batches appended to the detection stream from now on"""
+        self.detectionStream = DetectionStreamReader(path or detectionStreamFile)
+
+    def ingestDetections(self):
+        """Spawn vehicles for detection batches appended to the stream since the last call"""
+        if self.detectionStream is None:
+            return
+        for batch, written_at in self.detectionStream.poll():
+            stats = self.ingestStats
+            stats['batches'] += 1
+            stats['vehicles'] += len(batch)
+            latency = time.time() - written_at
+            stats['totalLatency'] += latency
+            stats['maxLatency'] = max(stats['maxLatency'], latency)
+            self.spawnDetections(batch)
+            if self.events is None:
+                print(f"✓ Ingested {len(batch)} streamed detections ({latency * 1000:.0f} ms after save)")
+
+    def generateTraffic(self):
+        """Spawn the generator's arrivals up to the current simulated time"""
+        if self.generator is None:
+            return
+        for _, direction, vehicleClass in self.generator.poll(self.controller.clock):
+            self.spawnVehicle(vehicleClass, direction, is_detected=False)
+
+    def printIngestStats(self):
+        stats = self.ingestStats
+        if stats['batches'] == 0:
+            return
+        print(f"Streamed detections: {stats['vehicles']} vehicles in {stats['batches']} batches, "
+              f"ingest latency avg {stats['totalLatency'] / stats['batches'] * 1000:.0f} ms, "
+              f"max {stats['maxLatency'] * 1000:.0f} ms")
+
+    def printStatus(self):
+        signals = self.signals
+        for i in range(0, noOfSignals):
+            times = f"r:{displaySeconds(signals[i].red)} y:{displaySeconds(signals[i].yellow)} g:{displaySeconds(signals[i].green)}"
+            if i == self.controller.currentGreen:
+                if self.controller.currentYellow == 0:
+                    print(f" GREEN TS{i+1}-> {times}")
+                else:
+                    print(f"YELLOW TS{i+1}-> {times}")
+            else:
+                print(f"   RED TS{i+1}-> {times}")
+        print()
+
+    def printDynamicGreenTimes(self):
+        """Print the calculated dynamic green times for all 4 lanes"""
+        print("\n--- DYNAMIC GREEN SIGNAL TIMES FOR ALL LANES ---")
+        for i in range(noOfSignals):
+            direction = directionNumbers[i]
+            dynamic_green = self.calculate_dynamic_green_time(direction)
+            vehicle_count = int(self.vehicleState.waiting[i].sum())
+            print(f"Lane {i+1} ({direction.upper():5}): {dynamic_green}s green | {vehicle_count} vehicles waiting")
+        print("---" * 15)
+
+    def printSummary(self):
+        totalVehicles = 0
+        vehicles = self.vehicles
+        print('\n--- SIMULATION ENDED ---')
+        print('Lane-wise Vehicle Counts')
+        for i in range(noOfSignals):
+            print(f'Lane {i+1} ({directionNumbers[i]}): {vehicles[directionNumbers[i]]["crossed"]}')
+            totalVehicles += vehicles[directionNumbers[i]]['crossed']
+        print(f'Total vehicles passed: {totalVehicles}')
+        print(f'Total time passed: {self.timeElapsed}')
+        print(f'Vehicles per unit time: {(float(totalVehicles)/float(max(self.timeElapsed, 1))):.2f}')
+        if self.actuated:
+            changes = self.controller.phaseChanges
+            print(f"Actuated phases: {changes['gapOut']} gap-outs, {changes['maxOut']} max-outs, "
+                  f"{changes['skipped']} empty phases skipped")
+
+    def collectMetrics(self):
+        """Throughput and delay figures for the run so far"""
+        delays = self.vehicleState.delayStats(self.controller.clock)
+        totalVehicles = sum(self.vehicles[direction]['crossed'] for direction in directionNumbers.values())
+        metrics = {
+            'sim_time': self.timeElapsed,
+            'total_crossed': totalVehicles,
+            'vehicles_per_unit_time': totalVehicles / self.timeElapsed if self.timeElapsed else 0.0,
+            'avg_delay': delays['avgDelay'],
+            'max_delay': delays['maxDelay'],
+            'waiting_at_end': delays['waiting'],
+            'avg_wait_at_end': delays['avgWait'],
+            'vehicles_on_screen': len(self.vehicleBySlot),
+        }
+        if self.actuated:
+            metrics.update({'gap_outs': self.controller.phaseChanges['gapOut'],
+                            'max_outs': self.controller.phaseChanges['maxOut'],
+                            'phases_skipped': self.controller.phaseChanges['skipped']})
+        for direction in directionNumbers.values():
+            metrics[f'crossed_{direction}'] = self.vehicles[direction]['crossed']
+        return metrics
+
+    def runHeadless(self, duration=None, image_dir=None):
+        """
+        Run the simulation without a window on a discrete clock.
+        
+        Each simulated second is framesPerSecond simulateFrame() steps, the
+        same steps the visual mode takes, just without pacing or rendering.
+        """
+        duration = simTime if duration is None else duration
+        # Callers may have loaded (and checked) the detections already
+        if self.detected_vehicles_from_file is None:
+            self.loadDetections(image_dir)
+        self.create_vehicles_from_detections()
+        self.controller.start()
+        
+        wallStart = time.perf_counter()
+        while self.timeElapsed < duration:
+            self.ingestDetections()
+            while not self.simulateFrame():
+                pass
+        wallTime = time.perf_counter() - wallStart
+        
+        self.printSummary()
+        self.printIngestStats()
+        if self.generator is not None:
+            print(f"Generated arrivals: {self.generator.generated} (seed {self.generator.seed}), "
+                  f"{len(self.vehicleBySlot)} vehicles still on screen")
+        cacheStats = spriteCache.stats()
+        print(f"Sprite cache: {cacheStats['hits']} hits, {cacheStats['misses']} misses, {cacheStats['files']} files decoded")
+        print(f'Wall-clock time: {wallTime:.2f}s ({duration / max(wallTime, 1e-9):.0f}x real time)')
+        
+        metrics = self.collectMetrics()
+        metrics['wall_time'] = wallTime
+        return metrics
 
 
-def repeat():
-    global currentGreen, currentYellow, nextGreen
-    
-    # Print dynamic green times for all 4 lanes
-    printDynamicGreenTimes()
-    
-    # Calculate dynamic green time based on vehicle density
-    dynamic_green = calculate_dynamic_green_time(directionNumbers[currentGreen])
-    signals[currentGreen].green = dynamic_green
-    
-    while signals[currentGreen].green > 0:
-        printStatus()
-        updateValues()
-        time.sleep(1)
-    currentYellow = 1
-    
-    for i in range(0, 3):
-        stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
-    
-    while signals[currentGreen].yellow > 0:
-        printStatus()
-        updateValues()
-        time.sleep(1)
-    currentYellow = 0
-    
-    signals[currentGreen].green = defaultGreen
-    signals[currentGreen].yellow = defaultYellow
-    signals[currentGreen].red = defaultRed
-    
-    currentGreen = nextGreen
-    nextGreen = (currentGreen + 1) % noOfSignals
-    signals[nextGreen].red = signals[currentGreen].yellow + signals[currentGreen].green
-    repeat()
+class Renderer:
+    """
+    Draws FrameSnapshots into the window, touching only what changed.
 
+    The background and signal images are converted to the display format
+    once and text surfaces come from a TextCache. Each frame, only the old
+    and new areas of vehicles that moved and of signals or counters whose
+    surface changed are repainted, and draw() returns those rectangles for
+    pygame.display.update(). redrawAll() forces one full-window frame.
+    """
 
-def printStatus():
-    for i in range(0, noOfSignals):
-        if i == currentGreen:
-            if currentYellow == 0:
-                print(f" GREEN TS{i+1}-> r:{signals[i].red} y:{signals[i].yellow} g:{signals[i].green}")
-            else:
-                print(f"YELLOW TS{i+1}-> r:{signals[i].red} y:{signals[i].yellow} g:{signals[i].green}")
-        else:
-            print(f"   RED TS{i+1}-> r:{signals[i].red} y:{signals[i].yellow} g:{signals[i].green}")
-    print()
-
-def printDynamicGreenTimes():
-    """Print the calculated dynamic green times for all 4 lanes"""
-    print("\n--- DYNAMIC GREEN SIGNAL TIMES FOR ALL LANES ---")
-    for i in range(noOfSignals):
-        direction = directionNumbers[i]
-        dynamic_green = calculate_dynamic_green_time(direction)
-        vehicle_count = sum(len(vehicles[direction][lane]) for lane in range(3))
-        print(f"Lane {i+1} ({direction.upper():5}): {dynamic_green}s green | {vehicle_count} vehicles waiting")
-    print("---" * 15)
-
-
-def updateValues():
-    for i in range(0, noOfSignals):
-        if i == currentGreen:
-            if currentYellow == 0:
-                signals[i].green -= 1
-                signals[i].totalGreenTime += 1
+    def __init__(self, screen, font):
+        self.screen = screen
+        self.background = pygame.image.load('images/mod_int.png').convert()
+        self.signalImages = {state: pygame.image.load(f'images/signals/{state}.png').convert_alpha()
+                             for state in ('red', 'yellow', 'green')}
+        self.text = TextCache(font)
+        # (surface, rect) last drawn per overlay key and per vehicle slot
+        self.overlays = {}
+        self.drawn = {}
+        self.fullRedraw = True
+
+    def redrawAll(self):
+        self.fullRedraw = True
+
+    def _overlays(self, frame):
+        """(key, surface, position) of the signal lights, timers, counters and elapsed time"""
+        signals = frame.signals
+        items = []
+        for i in range(0, noOfSignals):
+            red, yellow, green = (displaySeconds(t) for t in signals.times[i])
+            if i == signals.currentGreen:
+                if signals.currentYellow == 1:
+                    signalText = "STOP" if yellow == 0 else yellow
+                    light = 'yellow'
+                else:
+                    signalText = "SLOW" if green == 0 else green
+                    light = 'green'
             else:
-                signals[i].yellow -= 1
+                if red <= 10:
+                    signalText = "GO" if red == 0 else red
+                else:
+                    signalText = "---"
+                light = 'red'
+            items.append((('signal', i), self.signalImages[light], signalCoods[i]))
+            items.append((('timer', i), self.text.render(str(signalText), white, black), signalTimerCoods[i]))
+            items.append((('count', i), self.text.render(str(frame.crossed[i]), black, white), vehicleCountCoods[i]))
+        items.append(('elapsed', self.text.render("Time Elapsed: " + str(frame.timeElapsed), black, white),
+                      (1100, 50)))
+        return items
+
+    def draw(self, frame, alpha=1.0):
+        """
+        Bring the window up to date with frame and return the rectangles that
+        changed. Vehicles are drawn alpha of the way from their previous
+        step's position to the current one.
+        """
+        screen = self.screen
+        window = screen.get_rect()
+        overlays = [(key, surface, surface.get_rect(topleft=position))
+                    for key, surface, position in self._overlays(frame)]
+        beta = 1.0 - alpha
+        xs = (frame.x - beta * (frame.x - frame.prevX)).astype(int).tolist()
+        ys = (frame.y - beta * (frame.y - frame.prevY)).astype(int).tolist()
+        current = {slot: (image, image.get_rect(topleft=(x, y)))
+                   for slot, image, x, y in zip(frame.slots.tolist(), frame.images.tolist(), xs, ys)}
+
+        if self.fullRedraw:
+            self.fullRedraw = False
+            dirty = [window]
         else:
-            signals[i].red -= 1
-
-
-def simulationTime():
-    global timeElapsed, simTime
-    while True:
-        timeElapsed += 1
-        time.sleep(1)
-        if timeElapsed == simTime:
-            totalVehicles = 0
-            print('\n--- SIMULATION ENDED ---')
-            print('Lane-wise Vehicle Counts')
-            for i in range(noOfSignals):
-                print(f'Lane {i+1} ({directionNumbers[i]}): {vehicles[directionNumbers[i]]["crossed"]}')
-                totalVehicles += vehicles[directionNumbers[i]]['crossed']
-            print(f'Total vehicles passed: {totalVehicles}')
-            print(f'Total time passed: {timeElapsed}')
-            print(f'Vehicles per unit time: {(float(totalVehicles)/float(timeElapsed)):.2f}')
-            os._exit(1)
+            # Old and new area of everything that moved, changed or went away
+            dirty = []
+            for key, surface, rect in overlays:
+                previous = self.overlays.get(key)
+                if previous is None or previous[0] is not surface:
+                    dirty.append(rect.union(previous[1]) if previous else rect)
+            for slot, drawn in current.items():
+                previous = self.drawn.get(slot)
+                if previous is None:
+                    dirty.append(drawn[1])
+                elif previous != drawn:
+                    # A reused slot can jump from the exit to the spawn point; don't repaint everything between
+                    if previous[1].colliderect(drawn[1]):
+                        dirty.append(drawn[1].union(previous[1]))
+                    else:
+                        dirty.extend((previous[1], drawn[1]))
+            dirty.extend(previous[1] for slot, previous in self.drawn.items() if slot not in current)
+            # Vehicles queued off screen have negative positions
+            dirty = [area for area in (rect.clip(window) for rect in dirty) if area.width and area.height]
+        self.overlays = {key: (surface, rect) for key, surface, rect in overlays}
+        self.drawn = current
+
+        # Repaint each area from the background up, in the original draw order, so sprites
+        # with alpha edges are never blended over themselves
+        overlayRects = [rect for _, _, rect in overlays]
+        vehicles = list(current.values())
+        vehicleRects = [rect for _, rect in vehicles]
+        for area in dirty:
+            screen.set_clip(area)
+            screen.blit(self.background, area, area)
+            for i in area.collidelistall(overlayRects):
+                screen.blit(overlays[i][1], overlayRects[i])
+            for i in area.collidelistall(vehicleRects):
+                screen.blit(vehicles[i][0], vehicleRects[i])
+        screen.set_clip(None)
+        return dirty
+
+
+class FixedStepLoop:
+    """
+    Runs an Intersection in the window's time on its own thread.
+
+    The simulation only ever moves in simulateFrame() steps of
+    1/framesPerSecond simulated seconds, exactly as in headless mode, and
+    the thread paces them so that `speed` simulated seconds pass per
+    wall-clock second. Rendering runs at its own rate: a slow frame or a
+    higher speed only means more steps between two drawn frames, never
+    different results.
+
+    This thread is the only one that touches the intersection while it
+    runs. After every step it commits an immutable FrameSnapshot to
+    self.frame with a single assignment; the render loop draws whatever
+    frame is current, so it always sees one consistent step and neither
+    side ever waits on a lock. stop() ends the run early; `finished` is
+    set once the thread is done either way.
+    """
+
+    def __init__(self, intersection, duration, speed=1.0):
+        self.intersection = intersection
+        self.duration = duration
+        self.speed = speed
+        self.frame = None
+        self.started = None
+        self.stopEvent = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(name="simulation", target=self.run, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """Ask the thread to finish after its current step and wait for it"""
+        self.stopEvent.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def due(self):
+        """Steps that should have been taken by now (fractional)"""
+        if self.started is None:
+            return 0.0
+        return (time.monotonic() - self.started) * self.speed * framesPerSecond
+
+    def alpha(self, frame):
+        """How far the wall clock is between frame's step and the next one, 0 to 1"""
+        return min(1.0, max(0.0, self.due() - frame.step))
+
+    def run(self):
+        try:
+            self._run()
+        except BaseException as error:
+            self.error = error
+        finally:
+            self.finished.set()
+
+    def _run(self):
+        intersection = self.intersection
+        intersection.create_vehicles_from_detections()
+        intersection.controller.start()
+        self.frame = intersection.snapshot()
+        stepsPerSecond = self.speed * framesPerSecond
+        metrics = intersection.metrics
+        if metrics is not None:
+            lag = metrics.summary('step_lag_seconds', 'How far behind the wall-clock schedule a step started')
+            jitter = metrics.summary('step_jitter_seconds',
+                                     'How much later than requested the simulation thread woke up')
+        self.started = time.monotonic()
+        while intersection.timeElapsed < self.duration:
+            # Checked every iteration: a loop that is behind schedule never waits on the event
+            if self.stopEvent.is_set():
+                return
+            ahead = self.frame.step + 1 - self.due()
+            if ahead > 0:
+                requested = ahead / stepsPerSecond
+                sleepStart = time.monotonic()
+                self.stopEvent.wait(requested)
+                if metrics is not None:
+                    jitter.observe(max(0.0, time.monotonic() - sleepStart - requested))
+                continue
+            if metrics is not None:
+                lag.observe(-ahead / stepsPerSecond)
+            intersection.ingestDetections()
+            newSecond = intersection.simulateFrame()
+            self.frame = intersection.snapshot()
+            if newSecond and intersection.events is None:
+                intersection.printStatus()
 
 
 # Main Simulation Loop
-if __name__ == "__main__":
-    print("Starting Traffic Simulation...")
-    print("Waiting for vehicle detections from app.py...")
+def positive(cast):
+    """argparse type that converts with cast and rejects zero and negative values"""
+    def parse(text):
+        try:
+            value = cast(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"not a number: {text!r}") from None
+        if value <= 0:
+            raise argparse.ArgumentTypeError(f"must be positive, got {text!r}")
+        return value
+    return parse
+
+
+def main(argv=None, timing='dynamic', defaultSimTime=None):
+    """Command line entry point; simulation_static_time.py calls it with timing='static'"""
+    global simTime
     
-    # Load detections
-    load_detected_vehicles()
+    parser = argparse.ArgumentParser(description="YOLO traffic signal simulation")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window on a simulated clock, as fast as possible")
+    parser.add_argument("--sim-time", type=int, default=defaultSimTime or simTime,
+                        help="simulated seconds to run (default: %(default)s)")
+    parser.add_argument("--detect", metavar="IMAGE_DIR",
+                        help="run YOLO on IMAGE_DIR/<right|down|left|up>/ images instead of reading detected_vehicles.json")
+    parser.add_argument("--follow", action="store_true",
+                        help=f"keep spawning vehicles from batches app.py appends to {detectionStreamFile}")
+    parser.add_argument("--timing", choices=list(strategies), default=timing,
+                        help="static greens, density-based greens, or actuated gap-out / max-out "
+                             "(default: %(default)s)")
+    parser.add_argument("--arrivals", type=parse_rates, metavar="DIR=PER_MIN,...",
+                        help="add seeded Poisson arrivals, e.g. right=30,down=10,left=20,up=5 vehicles per minute")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --arrivals (default: %(default)s)")
+    parser.add_argument("--profile", type=parse_profile, metavar="START:MULT,...",
+                        help="scale --arrivals over time, e.g. 0:0.5,300:2,600:1")
+    parser.add_argument("--metrics-out", metavar="PATH",
+                        help="write frame/controller timings and per-approach time series to PATH (.json or .csv)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve live metrics in Prometheus text format at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--policy", choices=list(policies),
+                        help="how the next green is picked (default: round-robin, skip-empty with --timing actuated)")
+    parser.add_argument("--speed", type=positive(float), default=1.0,
+                        help="simulated seconds per wall-clock second in the window (default: %(default)s)")
+    parser.add_argument("--fps", type=positive(int), default=framesPerSecond,
+                        help="frames drawn per second; the simulation always steps %d times per simulated "
+                             "second (default: %%(default)s)" % framesPerSecond)
+    parser.add_argument("--event-log", metavar="PATH",
+                        help="log phase changes, spawns and crossings to PATH (.jsonl, anything else is binary) "
+                             "instead of printing signal status and created vehicles")
+    parser.add_argument("--log-level", choices=list(LEVELS), default='vehicles',
+                        help="events to log: phase changes only, or also spawns and crossings (default: %(default)s)")
+    args = parser.parse_args(argv)
+    simTime = args.sim_time
     
-    thread4 = threading.Thread(name="simulationTime", target=simulationTime, args=())
-    thread4.daemon = True
-    thread4.start()
+    metrics = MetricsRegistry() if args.metrics_out or args.metrics_port else None
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    events = None
+    if args.event_log:
+        events = EventLog(args.event_log, directionNumbers.values(), timingClasses, args.log_level)
+    intersection = Intersection(verbose=not args.headless, timing=args.timing, policy=args.policy, metrics=metrics,
+                                events=events)
+    if args.follow:
+        intersection.follow()
+    if args.arrivals:
+        intersection.generator = TrafficGenerator(args.arrivals, seed=args.seed, profile=args.profile)
     
-    thread2 = threading.Thread(name="initialization", target=initialize, args=())
-    thread2.daemon = True
-    thread2.start()
+    if args.headless:
+        intersection.runHeadless(simTime, args.detect)
+        if args.metrics_out:
+            metrics.dump(args.metrics_out)
+        if metrics is not None:
+            metrics.close()
+        if events is not None:
+            events.close()
+            print(f"Logged {events.written} events to {args.event_log}")
+        return
     
-    black = (0, 0, 0)
-    white = (255, 255, 255)
+    print("Starting Traffic Simulation...")
+    print("Waiting for vehicle detections from app.py...")
+    
+    # Load detections
+    intersection.loadDetections(args.detect)
     
     screenWidth = 1400
     screenHeight = 800
     screenSize = (screenWidth, screenHeight)
     
-    background = pygame.image.load('images/mod_int.png')
-    
     screen = pygame.display.set_mode(screenSize)
     pygame.display.set_caption("YOLO Traffic Simulation with Real Detections")
+    renderer = Renderer(screen, pygame.font.Font(None, 30))
     
-    redSignal = pygame.image.load('images/signals/red.png')
-    yellowSignal = pygame.image.load('images/signals/yellow.png')
-    greenSignal = pygame.image.load('images/signals/green.png')
-    font = pygame.font.Font(None, 30)
+    loop = FixedStepLoop(intersection, simTime, args.speed)
+    loop.start()
     
     clock = pygame.time.Clock()
     
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-        
-        # Create vehicles from detections on first frame
-        if not vehicles_created:
-            create_vehicles_from_detections()
-        
-        screen.blit(background, (0, 0))
-        
-        for i in range(0, noOfSignals):
-            if i == currentGreen:
-                if currentYellow == 1:
-                    if signals[i].yellow == 0:
-                        signals[i].signalText = "STOP"
-                    else:
-                        signals[i].signalText = signals[i].yellow
-                    screen.blit(yellowSignal, signalCoods[i])
-                else:
-                    if signals[i].green == 0:
-                        signals[i].signalText = "SLOW"
-                    else:
-                        signals[i].signalText = signals[i].green
-                    screen.blit(greenSignal, signalCoods[i])
-            else:
-                if signals[i].red <= 10:
-                    if signals[i].red == 0:
-                        signals[i].signalText = "GO"
-                    else:
-                        signals[i].signalText = signals[i].red
-                else:
-                    signals[i].signalText = "---"
-                screen.blit(redSignal, signalCoods[i])
-        
-        signalTexts = ["", "", "", ""]
-        for i in range(0, noOfSignals):
-            signalTexts[i] = font.render(str(signals[i].signalText), True, white, black)
-            screen.blit(signalTexts[i], signalTimerCoods[i])
-            displayText = vehicles[directionNumbers[i]]['crossed']
-            vehicleCountText = font.render(str(displayText), True, black, white)
-            screen.blit(vehicleCountText, vehicleCountCoods[i])
-        
-        timeElapsedText = font.render(("Time Elapsed: " + str(timeElapsed)), True, black, white)
-        screen.blit(timeElapsedText, (1100, 50))
-        
-        for vehicle in simulation:
-            screen.blit(vehicle.currentImage, [vehicle.x, vehicle.y])
-            vehicle.move()
-        
-        pygame.display.update()
-        clock.tick(30)
\ No newline at end of file
+    frameBudget = 1.0 / args.fps
+    if metrics is not None:
+        phaseTimes = [metrics.summary(f'frame_{phase}_seconds', f'Render loop time spent on {phase}')
+                      for phase in ('events', 'blit', 'display')]
+        frameWork = metrics.summary('frame_seconds', 'Render loop work per frame, excluding the frame-rate wait')
+        frameInterval = metrics.summary('frame_interval_seconds', 'Time between consecutive frames')
+    
+    try:
+        while not loop.finished.is_set():
+            t0 = time.perf_counter()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    loop.stopEvent.set()
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    renderer.redrawAll()
+            t1 = time.perf_counter()
+            
+            frame = loop.frame
+            dirty = renderer.draw(frame, loop.alpha(frame)) if frame is not None else []
+            t2 = time.perf_counter()
+            
+            pygame.display.update(dirty)
+            t3 = time.perf_counter()
+            interval = clock.tick(args.fps) / 1000.0
+            
+            if metrics is not None:
+                for summary, start, end in zip(phaseTimes, (t0, t1, t2), (t1, t2, t3)):
+                    summary.observe(end - start)
+                frameWork.observe(t3 - t0)
+                frameInterval.observe(interval)
+                if t3 - t0 > frameBudget:
+                    metrics.inc('frame_overruns_total', help='Frames whose work took longer than the frame budget')
+                if interval > 1.5 * frameBudget:
+                    metrics.inc('frames_dropped_total', help='Frames that arrived more than 1.5 budgets late')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Also reached on a render error: stop stepping before reading the results
+        loop.stop()
+        pygame.quit()
+        if loop.error is not None:
+            raise loop.error
+        intersection.printSummary()
+        intersection.printIngestStats()
+        if args.metrics_out:
+            metrics.dump(args.metrics_out)
+        if metrics is not None:
+            metrics.close()
+        if events is not None:
+            events.close()
+
+if __name__ == "__main__":
+    main()
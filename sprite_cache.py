@@ -0,0 +1,120 @@
+import os
+import pygame
+
+# Map similar vehicle types for fallback
+vehicleFallbacks = {
+    'motorbike': 'bike',
+    'bicycle': 'bike',
+    'van': 'car'
+}
+
+# Assuming original images face UP, rotate accordingly
+rotationAngles = {
+    'right': -90,  # Rotate 90 degrees clockwise
+    'down': 180,   # Rotate 180 degrees
+    'left': 90,    # Rotate 90 degrees counter-clockwise
+    'up': 0        # No rotation needed
+}
+
+imageExtensions = ['.png', '.jpg', '.jpeg']
+
+
+class SpriteCache:
+    """
+    Process-wide cache of vehicle surfaces keyed by (vehicle class, direction).
+
+    Fallback resolution, decoding and rotation happen once per key; every
+    vehicle of the same class and direction shares the same surface, so
+    sprites must treat it as read-only.
+    """
+
+    def __init__(self, imageDir="images/vehicles"):
+        self.imageDir = imageDir
+        self.surfaces = {}
+        self.decoded = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, vehicleClass, direction):
+        """Return the rotated surface for a vehicle class driving in direction"""
+        key = (vehicleClass, direction)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+
+        surface = self._load(vehicleClass)
+        angle = rotationAngles.get(direction, 0)
+        if angle != 0:
+            surface = pygame.transform.rotate(surface, angle)
+        # Converting needs a display; headless runs keep the decoded format
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+
+        self.surfaces[key] = surface
+        return surface
+
+    def _load(self, vehicleClass):
+        """Decode the image for a vehicle class or its fallback, once per file"""
+        for attempt in [vehicleClass, vehicleFallbacks.get(vehicleClass)]:
+            if attempt is None:
+                continue
+            for ext in imageExtensions:
+                path = os.path.join(self.imageDir, f"{attempt}{ext}")
+                if path in self.decoded:
+                    return self.decoded[path]
+                if os.path.exists(path):
+                    try:
+                        self.decoded[path] = pygame.image.load(path)
+                        return self.decoded[path]
+                    except pygame.error:
+                        continue
+
+        # Fallback to colored rectangle if image not found
+        surface = pygame.Surface((50, 30))
+        surface.fill((100, 100, 100))
+        return surface
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.surfaces),
+                'files': len(self.decoded)}
+
+    def clear(self):
+        self.surfaces.clear()
+        self.decoded.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+spriteCache = SpriteCache()
+
+
+class TextCache:
+    """
+    Rendered text surfaces keyed by (text, colour, background).
+
+    Signal timers, counters and the elapsed time only change once a second,
+    so each distinct string is rendered once and reused until the cache
+    reaches maxEntries, when it starts over.
+    """
+
+    def __init__(self, font, maxEntries=1024):
+        self.font = font
+        self.maxEntries = maxEntries
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color, background=None):
+        key = (text, color, background)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        if len(self.surfaces) >= self.maxEntries:
+            self.surfaces.clear()
+        surface = self.font.render(text, True, color, background)
+        self.surfaces[key] = surface
+        return surface
@@ -0,0 +1,165 @@
+"""
+Parameter sweep over signal timing plans.
+
+Runs headless simulations for every combination (or a random sample) of
+timing parameters and detection files on a process pool, and writes one row
+of throughput and delay metrics per run to CSV or Parquet.
+
+    python sweep.py --detections detected_vehicles.npz \
+        --param defaultMinimum=5,10,15 --param defaultMaximum=40,60 \
+        --param vehicle_timings.car=1.5,2.0 --param noOfLanes=2,3 \
+        --sim-time 600 --out sweep_results.csv
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from timing_strategy import strategies
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Intersection arguments that can be swept, plus vehicle_timings.<class>
+SWEEPABLE = ('defaultMinimum', 'defaultMaximum', 'defaultYellow', 'defaultGreen', 'noOfLanes')
+
+
+def parse_value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"not a number: {text}")
+
+
+def parse_param(text):
+    """'name=1,2,3' -> (name, [1, 2, 3]); 'name=lo:hi' -> (name, (lo, hi)) for random sampling"""
+    name, _, values = text.partition('=')
+    if name not in SWEEPABLE and not name.startswith('vehicle_timings.'):
+        raise argparse.ArgumentTypeError(f"unknown parameter {name!r}; use one of {', '.join(SWEEPABLE)} "
+                                         f"or vehicle_timings.<class>")
+    if ':' in values:
+        lo, hi = (parse_value(v) for v in values.split(':', 1))
+        return name, (lo, hi)
+    return name, [parse_value(v) for v in values.split(',')]
+
+
+def build_plans(params, samples=None, seed=0):
+    """Full grid of params, or `samples` random draws when samples is set"""
+    names = [name for name, _ in params]
+    if samples is None:
+        ranges = [name for name, values in params if isinstance(values, tuple)]
+        if ranges:
+            raise ValueError(f"ranges need --samples: {', '.join(ranges)}")
+        return [dict(zip(names, combo)) for combo in itertools.product(*(values for _, values in params))]
+
+    rng = random.Random(seed)
+    plans = []
+    for _ in range(samples):
+        plan = {}
+        for name, values in params:
+            if isinstance(values, tuple):
+                lo, hi = values
+                plan[name] = rng.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rng.uniform(lo, hi)
+            else:
+                plan[name] = rng.choice(values)
+        plans.append(plan)
+    return plans
+
+
+def run_trial(job):
+    """Run one headless simulation on its own Intersection in this worker process"""
+    plan, detection_file, sim_time, timing = job
+    os.chdir(REPO_DIR)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        import simulation
+
+        options = {}
+        vehicleTimings = dict(simulation.vehicle_timings)
+        for name, value in plan.items():
+            if name.startswith('vehicle_timings.'):
+                vehicleTimings[name.split('.', 1)[1]] = value
+            else:
+                options[name] = value
+        intersection = simulation.Intersection(vehicleTimings=vehicleTimings, detectionFiles=[detection_file],
+                                               timing=timing, verbose=False, **options)
+        # A run without its detections would still write a row, with no traffic in it
+        loadOutput = output.tell()
+        if not intersection.load_detected_vehicles():
+            reason = output.getvalue()[loadOutput:].strip() or "file not found"
+            raise ValueError(f"could not load {detection_file}: {reason}")
+        metrics = intersection.runHeadless(sim_time)
+
+    row = {'detection_file': detection_file, 'timing': timing}
+    row.update(plan)
+    row.update(metrics)
+    return row
+
+
+def write_results(path, rows):
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+        return
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel sweep of signal timing parameters")
+    parser.add_argument("--detections", nargs='+', required=True, metavar="FILE",
+                        help="detection files (.npz or .json) to run every plan against")
+    parser.add_argument("--param", action='append', type=parse_param, default=[], metavar="NAME=VALUES",
+                        help="comma-separated values, or lo:hi with --samples (repeatable)")
+    parser.add_argument("--timing", nargs='+', default=['dynamic'], choices=list(strategies),
+                        help="timing strategies to run every plan with (default: dynamic)")
+    parser.add_argument("--samples", type=int, help="draw this many random plans instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --samples (default: %(default)s)")
+    parser.add_argument("--sim-time", type=int, default=500, help="simulated seconds per run (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="sweep_results.csv", help="output .csv or .parquet (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.detections if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"detection file(s) not found: {', '.join(missing)}")
+
+    plans = build_plans(args.param, args.samples, args.seed)
+    detection_files = [os.path.abspath(path) for path in args.detections]
+    jobs = [(plan, path, args.sim_time, timing) for plan in plans for path in detection_files
+            for timing in args.timing]
+    print(f"Running {len(jobs)} simulations ({len(plans)} plans x {len(detection_files)} detection files "
+          f"x {len(args.timing)} timing strategies) on {args.workers} workers...")
+
+    start = time.perf_counter()
+    rows = []
+    with multiprocessing.Pool(args.workers) as pool:
+        try:
+            for row in pool.imap_unordered(run_trial, jobs):
+                rows.append(row)
+                label = ", ".join(f"{name}={row[name]}" for name in plans[0])
+                print(f"  [{len(rows)}/{len(jobs)}] {os.path.basename(row['detection_file'])} {row['timing']} "
+                      f"{label} -> {row['vehicles_per_unit_time']:.2f} veh/s, avg delay {row['avg_delay']:.1f}s")
+        finally:
+            # SDL turns SIGTERM into a quit event, so let workers exit instead of terminate()ing them,
+            # also when a run failed
+            pool.close()
+            pool.join()
+
+    write_results(args.out, rows)
+    print(f"Wrote {len(rows)} rows to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Green timing strategies for an Intersection.
+
+A strategy decides how long a green lasts. greenTime(intersection, direction)
+is asked when a phase starts, onGreen(intersection, direction) runs just
+before, and strategies with actuated = True hand the decision to the
+controller's per-tick gap-out / max-out logic instead.
+"""
+
+
+class StaticTiming:
+    """Every green lasts defaultGreen seconds (the former simulation_static_time.py)"""
+
+    name = 'static'
+    actuated = False
+
+    def greenTime(self, intersection, direction):
+        return intersection.defaultGreen
+
+    def onGreen(self, intersection, direction):
+        pass
+
+
+class DensityTiming:
+    """Green sized from the waiting vehicles by class when the phase starts"""
+
+    name = 'dynamic'
+    actuated = False
+
+    def greenTime(self, intersection, direction):
+        return intersection.calculate_dynamic_green_time(direction)
+
+    def onGreen(self, intersection, direction):
+        if intersection.verbose and intersection.events is None:
+            intersection.printDynamicGreenTimes()
+
+
+class ActuatedTiming:
+    """Green starts at defaultMinimum and is extended per tick from stop-line demand"""
+
+    name = 'actuated'
+    actuated = True
+
+    def greenTime(self, intersection, direction):
+        return intersection.defaultMinimum
+
+    def onGreen(self, intersection, direction):
+        pass
+
+
+strategies = {strategy.name: strategy for strategy in (StaticTiming, DensityTiming, ActuatedTiming)}
+
+
+def get_strategy(name):
+    """Timing strategy instance by name (see strategies)"""
+    try:
+        return strategies[name]()
+    except KeyError:
+        raise ValueError(f"unknown timing strategy {name!r}; use one of {', '.join(strategies)}") from None
@@ -0,0 +1,184 @@
+"""
+Seeded synthetic traffic.
+
+TrafficGenerator draws Poisson arrivals per direction, optionally scaled over
+time by a piecewise-constant profile, with vehicle classes drawn from a fixed
+mix. Every direction has its own random stream derived from the seed, so the
+same seed gives the same arrivals however often they are polled.
+
+Arrivals can be spawned straight into a running simulation
+(simulation.py --arrivals), written out as a detection file, or appended in
+real time to the detection stream that simulation.py --follow reads:
+
+    python traffic_generator.py --rate right=30 --rate down=10 --seed 7 --duration 600 --out heavy.npz
+    python traffic_generator.py --rate right=30,left=20 --profile 0:0.5,120:2 --stream detected_vehicles.stream
+"""
+import argparse
+import bisect
+import math
+import sys
+import time
+
+import numpy as np
+
+from detection_io import DETECTION_DTYPE, DetectionSet, append_detection_batch, export_json, save_detections
+
+# Class names as in simulation.vehicleTypes, with a mostly-car default mix
+defaultClassMix = {'car': 0.55, 'bike': 0.2, 'van': 0.1, 'bus': 0.08, 'truck': 0.07}
+directions = ('right', 'down', 'left', 'up')
+
+
+class TrafficGenerator:
+    """
+    rates are mean arrivals per minute for each direction. profile is a list
+    of (start_second, multiplier) pairs; the rate is multiplied by the value
+    of the last pair that has started (1.0 before the first). Time-varying
+    rates are sampled by thinning a Poisson process at the peak rate.
+    """
+
+    def __init__(self, rates, classMix=None, seed=0, profile=None):
+        self.rates = {direction: rate / 60.0 for direction, rate in rates.items() if rate > 0}
+        classMix = classMix or defaultClassMix
+        self.classes = list(classMix)
+        weights = np.array([classMix[c] for c in self.classes], dtype=np.float64)
+        self.weights = weights / weights.sum()
+        self.seed = seed
+        self.profile = sorted(profile or [])
+        if any(multiplier < 0 for _, multiplier in self.profile):
+            raise ValueError("profile multipliers must not be negative")
+        self.profileStarts = [start for start, _ in self.profile]
+        self.peak = max([1.0] + [multiplier for _, multiplier in self.profile])
+        self.rngs = {direction: np.random.default_rng([seed, directions.index(direction)])
+                     for direction in self.rates}
+        self.nextArrival = {direction: self._draw(direction, 0.0) for direction in self.rates}
+        self.generated = 0
+
+    def multiplier(self, t):
+        i = bisect.bisect_right(self.profileStarts, t)
+        return self.profile[i - 1][1] if i else 1.0
+
+    def _nextActive(self, t):
+        """Start of the first profile segment after t with a positive multiplier, inf if there is none"""
+        for start, multiplier in self.profile[bisect.bisect_right(self.profileStarts, t):]:
+            if multiplier > 0:
+                return start
+        return math.inf
+
+    def _draw(self, direction, t):
+        """Time of the next arrival after t (inf once the profile stays at 0)"""
+        rng = self.rngs[direction]
+        peakRate = self.rates[direction] * self.peak
+        while True:
+            # No candidate is ever accepted where the multiplier is 0; arrivals are memoryless,
+            # so drawing can restart where the rate becomes positive again
+            if self.multiplier(t) == 0:
+                t = self._nextActive(t)
+                if t == math.inf:
+                    return t
+            t += rng.exponential(1.0 / peakRate)
+            if rng.random() * self.peak <= self.multiplier(t):
+                return t
+
+    def poll(self, now):
+        """Arrivals up to simulated time now, as (time, direction, vehicleClass) in time order"""
+        arrivals = []
+        for direction, t in self.nextArrival.items():
+            rng = self.rngs[direction]
+            while t <= now:
+                arrivals.append((t, direction, self.classes[rng.choice(len(self.classes), p=self.weights)]))
+                t = self._draw(direction, t)
+            self.nextArrival[direction] = t
+        arrivals.sort()
+        self.generated += len(arrivals)
+        return arrivals
+
+
+def arrivals_to_detections(arrivals):
+    """Group arrivals into a DetectionSet (one box per vehicle, in arrival order per direction)"""
+    classNames = sorted({vehicleClass for _, _, vehicleClass in arrivals})
+    classIds = {name: i for i, name in enumerate(classNames)}
+    laneOffsets = [0]
+    rows = []
+    for direction in directions:
+        rows.extend((classIds[c], 1.0, (0.0, 0.0, 0.0, 0.0)) for _, d, c in arrivals if d == direction)
+        laneOffsets.append(len(rows))
+    return DetectionSet(np.array(rows, dtype=DETECTION_DTYPE), laneOffsets, directions, classNames)
+
+
+def parse_pairs(text, cast=float):
+    """'a=1,b=2' -> {'a': 1.0, 'b': 2.0}"""
+    pairs = {}
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        try:
+            pairs[name.strip()] = cast(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected NAME=NUMBER, got {item!r}") from None
+    return pairs
+
+
+def parse_rates(text):
+    rates = parse_pairs(text)
+    unknown = set(rates) - set(directions)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown direction(s) {', '.join(sorted(unknown))}")
+    return rates
+
+
+def parse_profile(text):
+    """'0:0.5,300:2' -> [(0.0, 0.5), (300.0, 2.0)]"""
+    try:
+        profile = [tuple(float(v) for v in item.split(':', 1)) for item in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START:MULTIPLIER pairs, got {text!r}") from None
+    if any(multiplier < 0 for _, multiplier in profile):
+        raise argparse.ArgumentTypeError(f"profile multipliers must not be negative, got {text!r}")
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seeded synthetic vehicle arrivals")
+    parser.add_argument("--rate", type=parse_rates, action='append', required=True, metavar="DIR=PER_MIN",
+                        help="mean arrivals per minute, e.g. right=30,down=10 (repeatable)")
+    parser.add_argument("--mix", type=parse_pairs, metavar="CLASS=WEIGHT",
+                        help="vehicle class weights (default: car=0.55,bike=0.2,van=0.1,bus=0.08,truck=0.07)")
+    parser.add_argument("--profile", type=parse_profile, metavar="START:MULT",
+                        help="rate multipliers over time, e.g. 0:0.5,300:2,600:1")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=600, help="seconds of traffic (default: %(default)s)")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", help="write all arrivals as one detection file (.npz or .json)")
+    output.add_argument("--stream", help="append arrivals to a detection stream in real time")
+    parser.add_argument("--batch-interval", type=float, default=1.0,
+                        help="seconds between stream batches (default: %(default)s)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="stream this many simulated seconds per wall-clock second (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rates = {}
+    for item in args.rate:
+        rates.update(item)
+    generator = TrafficGenerator(rates, args.mix, args.seed, args.profile)
+
+    if args.out:
+        detections = arrivals_to_detections(generator.poll(args.duration))
+        if args.out.endswith('.json'):
+            export_json(args.out, detections)
+        else:
+            save_detections(args.out, detections)
+        print(f"Wrote {len(detections)} arrivals {detections.counts()} to {args.out}")
+        return
+
+    start = time.monotonic()
+    t = 0.0
+    while t < args.duration:
+        t = min(t + args.batch_interval, args.duration)
+        time.sleep(max(0.0, start + t / args.speed - time.monotonic()))
+        arrivals = generator.poll(t)
+        if arrivals:
+            append_detection_batch(args.stream, arrivals_to_detections(arrivals))
+    print(f"Streamed {generator.generated} arrivals to {args.stream}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
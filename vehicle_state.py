@@ -0,0 +1,198 @@
+import numpy as np
+
+
+class VehicleState:
+    """
+    Array-backed state for every vehicle in the simulation.
+
+    Each vehicle owns one slot in flat NumPy columns (position, speed, extent,
+    stop position, crossed flag, direction, lane, class and the slot of the
+    vehicle ahead of it in the same direction and lane), plus an object
+    column with whatever image the caller draws it with. step() applies the
+    rules of the old per-sprite Vehicle.move() to all slots at once, so the
+    cost of a frame no longer depends on Python-level work per vehicle.
+
+    waiting[direction, class] counts vehicles that have not crossed yet. It
+    is updated when a vehicle is added and when it crosses, never recounted.
+
+    Crossed vehicles whose rear edge has passed their direction's exit line
+    are reported in exitedSlots; remove() frees the slot and add() reuses
+    freed slots first, so the arrays only grow with the peak number of
+    vehicles on screen. Crossing delays are folded into running totals when a
+    vehicle crosses, so they survive slot reuse.
+
+    Movement is resolved against the positions at the start of the frame, so a
+    follower reacts to its leader's move one frame later than the sequential
+    sprite loop did. Gaps are only ever larger than before, never smaller.
+    """
+
+    # Direction of travel along the axis and which axis is used, per direction name
+    axisSigns = {'right': 1.0, 'down': 1.0, 'left': -1.0, 'up': -1.0}
+    horizontalDirections = ('right', 'left')
+
+    def __init__(self, directionNumbers, stopLines, gap2, noOfClasses=1, capacity=256, exitLines=None):
+        noOfDirections = len(directionNumbers)
+        names = [directionNumbers[i] for i in range(noOfDirections)]
+        self.noOfDirections = noOfDirections
+        self.sign = np.array([self.axisSigns[name] for name in names])
+        self.horizontal = np.array([name in self.horizontalDirections for name in names])
+        self.stopLine = np.array([float(stopLines[name]) for name in names])
+        # Without exit lines vehicles are never reported as exited
+        exitLines = exitLines or {name: self.axisSigns[name] * np.inf for name in names}
+        self.exitLine = np.array([float(exitLines[name]) for name in names])
+        self.gap2 = gap2
+        # High-water mark of used slots; slots below it may be free (active is False)
+        self.count = 0
+        self.freeSlots = []
+        self.crossedCount = 0
+        self.crossedDelayTotal = 0.0
+        self.crossedDelayMax = 0.0
+        # Slots that crossed the stop line / left through the exit line during the last step()
+        self.crossedSlots = np.zeros(0, dtype=np.intp)
+        self.exitedSlots = np.zeros(0, dtype=np.intp)
+        self.waiting = np.zeros((noOfDirections, noOfClasses), dtype=np.int64)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'x', None)
+        columns = {
+            'x': np.float64, 'y': np.float64, 'prevX': np.float64, 'prevY': np.float64, 'speed': np.float64,
+            'width': np.float64, 'height': np.float64, 'stop': np.float64,
+            'crossed': np.bool_, 'active': np.bool_, 'direction': np.int8, 'lane': np.int8,
+            'vehicleClass': np.int8, 'leader': np.int32,
+            'spawnTime': np.float64, 'crossTime': np.float64, 'image': object,
+        }
+        for name, dtype in columns.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def add(self, x, y, speed, width, height, stop, direction, lane, vehicleClass=0, leader=-1, now=0.0,
+            image=None):
+        """Store a new vehicle, in a freed slot if there is one, and return its slot"""
+        if self.freeSlots:
+            slot = self.freeSlots.pop()
+        else:
+            if self.count == self.capacity:
+                self._allocate(self.capacity * 2)
+            slot = self.count
+            self.count += 1
+        self.x[slot] = self.prevX[slot] = x
+        self.y[slot] = self.prevY[slot] = y
+        self.speed[slot] = speed
+        self.width[slot] = width
+        self.height[slot] = height
+        self.stop[slot] = stop
+        self.crossed[slot] = False
+        self.active[slot] = True
+        self.direction[slot] = direction
+        self.lane[slot] = lane
+        self.vehicleClass[slot] = vehicleClass
+        self.leader[slot] = leader
+        self.spawnTime[slot] = now
+        self.crossTime[slot] = np.nan
+        self.image[slot] = image
+        self.waiting[direction, vehicleClass] += 1
+        return slot
+
+    def remove(self, slot):
+        """Free a slot; followers that were queued behind it no longer have a leader"""
+        if not self.crossed[slot]:
+            self.waiting[self.direction[slot], self.vehicleClass[slot]] -= 1
+        self.active[slot] = False
+        self.crossed[slot] = False
+        n = self.count
+        self.leader[:n][self.leader[:n] == slot] = -1
+        self.freeSlots.append(slot)
+
+    def step(self, currentGreen, currentYellow, now=0.0):
+        """
+        Move every vehicle by one frame at simulation time now.
+
+        Returns the number of vehicles that crossed the stop line this frame,
+        indexed by direction number.
+        """
+        n = self.count
+        # Positions before this step, for rendering between steps
+        self.prevX[:n] = self.x[:n]
+        self.prevY[:n] = self.y[:n]
+        if n == len(self.freeSlots):
+            self.crossedSlots = self.exitedSlots = np.zeros(0, dtype=np.intp)
+            return np.zeros(self.noOfDirections, dtype=np.int64)
+
+        direction = self.direction[:n]
+        horizontal = self.horizontal[direction]
+        sign = self.sign[direction]
+        pos = np.where(horizontal, self.x[:n], self.y[:n])
+        length = np.where(horizontal, self.width[:n], self.height[:n])
+
+        # Front and rear edges in the direction of travel
+        front = np.where(sign > 0, pos + length, pos)
+        rear = np.where(sign > 0, pos, pos + length)
+
+        active = self.active[:n]
+        crossed = self.crossed[:n]
+        crossing = active & ~crossed & (sign * front > sign * self.stopLine[direction])
+        crossed |= crossing
+        self.crossedSlots = np.flatnonzero(crossing)
+        if len(self.crossedSlots):
+            self.crossTime[:n][crossing] = now
+            np.subtract.at(self.waiting, (direction[crossing], self.vehicleClass[:n][crossing]), 1)
+            delays = now - self.spawnTime[:n][crossing]
+            self.crossedCount += len(delays)
+            self.crossedDelayTotal += float(delays.sum())
+            self.crossedDelayMax = max(self.crossedDelayMax, float(delays.max()))
+        self.exitedSlots = np.flatnonzero(crossed & (sign * rear > sign * self.exitLine[direction]))
+
+        green = (direction == currentGreen) & (currentYellow == 0)
+        free = (sign * front <= sign * self.stop[:n]) | crossed | green
+
+        leader = self.leader[:n]
+        hasLeader = leader >= 0
+        leaderRear = rear[np.where(hasLeader, leader, 0)]
+        clear = ~hasLeader | (sign * front < sign * leaderRear - self.gap2)
+
+        delta = np.where(active & free & clear, sign * self.speed[:n], 0.0)
+        self.x[:n] += np.where(horizontal, delta, 0.0)
+        self.y[:n] += np.where(horizontal, 0.0, delta)
+
+        return np.bincount(direction[crossing], minlength=self.noOfDirections)
+
+    def approachDemand(self, zone):
+        """Per direction, vehicles that have not crossed with their front within zone of the stop line"""
+        n = self.count
+        direction = self.direction[:n]
+        horizontal = self.horizontal[direction]
+        sign = self.sign[direction]
+        pos = np.where(horizontal, self.x[:n], self.y[:n])
+        length = np.where(horizontal, self.width[:n], self.height[:n])
+        front = np.where(sign > 0, pos + length, pos)
+        near = self.active[:n] & ~self.crossed[:n] & (sign * (self.stopLine[direction] - front) <= zone)
+        return np.bincount(direction[near], minlength=self.noOfDirections)
+
+    def approachStats(self, now):
+        """Per direction, the number of vehicles that have not crossed and their mean wait so far"""
+        n = self.count
+        waiting = self.active[:n] & ~self.crossed[:n]
+        direction = self.direction[:n][waiting]
+        queue = np.bincount(direction, minlength=self.noOfDirections)
+        totalWait = np.bincount(direction, weights=now - self.spawnTime[:n][waiting], minlength=self.noOfDirections)
+        return queue, np.divide(totalWait, queue, out=np.zeros(self.noOfDirections), where=queue > 0)
+
+    def delayStats(self, now):
+        """
+        Count, mean and max of seconds from spawn to crossing the stop line
+        over every vehicle that has crossed, and count and mean of seconds
+        waited so far by vehicles that have not crossed by now.
+        """
+        n = self.count
+        waitingDelays = now - self.spawnTime[:n][self.active[:n] & ~self.crossed[:n]]
+        return {
+            'crossed': self.crossedCount,
+            'avgDelay': self.crossedDelayTotal / self.crossedCount if self.crossedCount else 0.0,
+            'maxDelay': self.crossedDelayMax,
+            'waiting': len(waitingDelays),
+            'avgWait': float(waitingDelays.mean()) if len(waitingDelays) else 0.0,
+        }
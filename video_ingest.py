@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from detection import boxes_to_detections, predict_in_batches
+
+
+class LaneVideoSampler:
+    """
+    Decodes one lane's video file or stream on its own thread and keeps only
+    the most recent sampled frame.
+
+    Files are sampled by frame index (skipped frames are grabbed but never
+    decoded); live streams with no reported frame rate are sampled by wall
+    clock. A sampled frame that is replaced before detection picks it up is
+    simply counted as dropped.
+    """
+
+    def __init__(self, direction, source, sample_fps=1.0):
+        self.direction = direction
+        self.source = source
+        self.sample_fps = sample_fps
+        self.lock = threading.Lock()
+        self.latest = None
+        self.frames_sampled = 0
+        self.frames_dropped = 0
+        self.finished = threading.Event()
+        self.stopping = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(name=f"video-{direction}", target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+
+    def take(self):
+        """Return and clear the latest sampled frame as (frame_index, frame), or None"""
+        with self.lock:
+            latest, self.latest = self.latest, None
+        return latest
+
+    def _publish(self, frame_index, frame):
+        with self.lock:
+            if self.latest is not None:
+                self.frames_dropped += 1
+            self.latest = (frame_index, frame)
+            self.frames_sampled += 1
+
+    def _run(self):
+        import cv2
+
+        capture = cv2.VideoCapture(self.source)
+        try:
+            if not capture.isOpened():
+                self.error = f"Could not open {self.source}"
+                return
+            source_fps = capture.get(cv2.CAP_PROP_FPS) or 0
+            step = max(1, round(source_fps / self.sample_fps)) if source_fps > 0 else None
+            interval = 1.0 / self.sample_fps
+            next_sample = time.monotonic()
+            frame_index = 0
+            while not self.stopping.is_set():
+                if not capture.grab():
+                    break
+                if step is not None:
+                    wanted = frame_index % step == 0
+                else:
+                    wanted = time.monotonic() >= next_sample
+                if wanted:
+                    ok, frame = capture.retrieve()
+                    if ok:
+                        # OpenCV decodes BGR; the model and Streamlit expect RGB
+                        self._publish(frame_index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    next_sample += interval
+                    if step is not None:
+                        # Files decode faster than real time; pace them to the sample rate
+                        time.sleep(max(0.0, next_sample - time.monotonic()))
+                frame_index += 1
+        finally:
+            capture.release()
+            self.finished.set()
+
+
+class VideoDetectionPipeline:
+    """
+    Per-lane video ingestion feeding a background detection thread.
+
+    A dispatcher thread collects the newest sampled frame from every lane and
+    submits them as one batch to a single detection worker, never queueing a
+    lane that is still being processed, so slow inference drops frames
+    instead of building a backlog. Predictions on the shared model are
+    serialized, so one worker with batched lanes is all the model can use.
+    Each lane keeps its latest detections, a rolling vehicle count over the
+    last `window` processed frames and the error of its last failed batch.
+    """
+
+    def __init__(self, sources, provider, sample_fps=1.0, conf=0.5, window=10):
+        self.provider = provider
+        self.conf = conf
+        self.samplers = {direction: LaneVideoSampler(direction, source, sample_fps)
+                         for direction, source in sources.items()}
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-detect")
+        self.lock = threading.Lock()
+        self.busy = set()
+        self.lanes = {direction: {'detections': [], 'annotated': None, 'frame_index': None,
+                                  'counts': deque(maxlen=window), 'frames_processed': 0, 'error': None}
+                      for direction in sources}
+        self.stopping = threading.Event()
+        self.dispatcher = threading.Thread(name="video-dispatch", target=self._dispatch, daemon=True)
+
+    def start(self):
+        for sampler in self.samplers.values():
+            sampler.start()
+        self.dispatcher.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        for sampler in self.samplers.values():
+            sampler.stop()
+        # The dispatcher may be about to submit; the pool refuses work once shut down
+        if self.dispatcher.is_alive():
+            self.dispatcher.join()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def running(self):
+        return not self.stopping.is_set() and not all(s.finished.is_set() for s in self.samplers.values())
+
+    def _dispatch(self):
+        while not self.stopping.is_set():
+            batch = []
+            with self.lock:
+                for direction, sampler in self.samplers.items():
+                    if direction in self.busy:
+                        continue
+                    latest = sampler.take()
+                    if latest is not None:
+                        self.busy.add(direction)
+                        batch.append((direction, *latest))
+            if batch:
+                self.pool.submit(self._detect, batch)
+            elif self._drained():
+                break
+            else:
+                time.sleep(0.02)
+
+    def _drained(self):
+        """True once every sampler has finished and its last frame was processed"""
+        with self.lock:
+            return not self.busy and all(s.finished.is_set() and s.latest is None
+                                         for s in self.samplers.values())
+
+    def _detect(self, batch):
+        try:
+            with self.provider.predict_lock:
+                results, _ = predict_in_batches(self.provider.get(), [frame for _, _, frame in batch],
+                                                batch_size=len(batch), conf=self.conf)
+            class_names = self.provider.class_names
+            for (direction, frame_index, _), result in zip(batch, results):
+                detections = boxes_to_detections(result, class_names)
+                annotated = result.plot()
+                with self.lock:
+                    lane = self.lanes[direction]
+                    lane['detections'] = detections
+                    lane['annotated'] = annotated
+                    lane['frame_index'] = frame_index
+                    lane['counts'].append(len(detections))
+                    lane['frames_processed'] += 1
+                    lane['error'] = None
+        except Exception as error:
+            with self.lock:
+                for direction, _, _ in batch:
+                    self.lanes[direction]['error'] = f"Detection failed: {error}"
+        finally:
+            with self.lock:
+                self.busy.difference_update(direction for direction, _, _ in batch)
+
+    def snapshot(self):
+        """Per-lane status: latest detections and annotated frame, rolling count and frame counters"""
+        with self.lock:
+            status = {}
+            for direction, lane in self.lanes.items():
+                sampler = self.samplers[direction]
+                counts = lane['counts']
+                status[direction] = {
+                    'detections': list(lane['detections']),
+                    'rolling_count': sum(counts) / len(counts) if counts else 0.0,
+                    'latest_count': counts[-1] if counts else 0,
+                    'frame_index': lane['frame_index'],
+                    'frames_sampled': sampler.frames_sampled,
+                    'frames_processed': lane['frames_processed'],
+                    'frames_dropped': sampler.frames_dropped,
+                    'finished': sampler.finished.is_set(),
+                    'error': sampler.error or lane['error'],
+                    'annotated': lane['annotated'],
+                }
+            return status